@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.cache import cache
+from .services import CourseRoster
+
+ROSTER_VERSION_KEY = 'roster:version'
+
+
+def _roster_version():
+    cache.add(ROSTER_VERSION_KEY, 1, timeout=None)
+    return cache.get(ROSTER_VERSION_KEY, 1)
+
+
+def _roster_key(course_id, season_id):
+    return f"roster:v{_roster_version()}:course:{course_id}:season:{season_id}"
+
+
+def get_course_roster(course, season):
+    """
+    Retourne la liste des élèves attendus à un cours pour une saison, depuis le cache si possible.
+    Retourne un tuple (élèves, trouvé_en_cache).
+    """
+    key = _roster_key(course.id, season.id)
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+
+    data = CourseRoster.members(course, season)
+    cache.set(key, data, timeout=settings.ROSTER_CACHE_TIMEOUT)
+    return data, False
+
+
+def invalidate_rosters():
+    """
+    Invalide toutes les listes d'élèves (inscription, adhérent ou cours modifié).
+    """
+    _roster_version()
+    try:
+        cache.incr(ROSTER_VERSION_KEY)
+    except ValueError:
+        cache.set(ROSTER_VERSION_KEY, 1, timeout=None)
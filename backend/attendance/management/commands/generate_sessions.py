@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance.services import SessionGenerator
+from core.models import Season
+
+
+class Command(BaseCommand):
+    help = 'Pré-génère les séances d\'une saison à partir du planning hebdomadaire des cours (hors fermetures)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--season',
+            type=int,
+            help='Saison (id) ; saison active par défaut',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de séances insérées par lot',
+        )
+
+    def handle(self, *args, **options):
+        seasons = Season.objects.all()
+        season = seasons.filter(pk=options['season']).first() if options['season'] else seasons.filter(is_active=True).first()
+        if season is None:
+            raise CommandError("Saison introuvable.")
+
+        created = SessionGenerator.generate(season.start_date, season.end_date, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{created} séances créées pour la saison {season.name}."))
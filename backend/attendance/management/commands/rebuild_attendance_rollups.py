@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from attendance.services import AttendanceRollupService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit les compteurs de présences (membre x cours x mois) à partir des présences saisies'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de compteurs écrits par lot',
+        )
+
+    def handle(self, *args, **options):
+        total = AttendanceRollupService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} compteurs de présences reconstruits."))
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+        ('core', '0014_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='Premier jour du mois')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='attendance.course')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_rollups', to='core.member')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month', 'course'], name='attendance__month_198272_idx')],
+                'unique_together': {('member', 'course', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_holiday'),
+        ('core', '0015_registration_season_category_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='categories',
+            field=models.ManyToManyField(blank=True, related_name='courses', to='core.category'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='discipline',
+            field=models.CharField(blank=True, choices=[('EVEIL', 'Judo Éveil'), ('JUDO', 'Judo'), ('TAISO', 'Taïso'), ('TAISO_SENIOR', 'Taïso Senior'), ('APA', 'Activité Physique Adaptée'), ('JUJITSU', 'Ju-Jitsu')], max_length=20),
+        ),
+    ]
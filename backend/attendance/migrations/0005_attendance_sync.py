@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_course_eligibility'),
+        ('core', '0015_registration_season_category_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['updated_at', 'id'], name='attendance__updated_e973e4_idx'),
+        ),
+    ]
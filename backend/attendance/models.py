@@ -1,5 +1,5 @@
 from django.db import models
-from core.models import Member
+from core.models import Category, Member
 
 class Course(models.Model):
     DAYS_OF_WEEK = (
@@ -18,10 +18,30 @@ class Course(models.Model):
     end_time = models.TimeField()
     teacher = models.CharField(max_length=100, blank=True, null=True)
     description = models.TextField(blank=True)
+    # Éligibilité (feuille d'appel) : vide = toutes les disciplines / catégories
+    discipline = models.CharField(max_length=20, choices=Member.DISCIPLINE_CHOICES, blank=True)
+    categories = models.ManyToManyField(Category, blank=True, related_name='courses')
 
     def __str__(self):
         return f"{self.name} ({self.get_day_of_week_display()})"
 
+class Holiday(models.Model):
+    """
+    Période de fermeture du club (vacances scolaires, jours fériés) : aucune séance n'y est générée.
+    """
+    name = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+
+    class Meta:
+        ordering = ['start_date']
+        constraints = [
+            models.CheckConstraint(check=models.Q(end_date__gte=models.F('start_date')), name='holiday_end_after_start'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.start_date} - {self.end_date})"
+
 class Session(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='sessions')
     date = models.DateField()
@@ -44,9 +64,42 @@ class Attendance(models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='attendances')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PRESENT')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Synchronisation : heure de la modification côté client (dernier écrivain gagnant)
+    # et heure d'écriture côté serveur (curseur des deltas)
+    changed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('session', 'member')
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.member} - {self.session} - {self.status}"
+
+class AttendanceRollup(models.Model):
+    """
+    Compteurs de présences précalculés par membre, cours et mois.
+    Maintenus par attendance.tasks.refresh_attendance_rollups après chaque saisie.
+    """
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='attendance_rollups')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='attendance_rollups')
+    month = models.DateField(help_text="Premier jour du mois")
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('member', 'course', 'month')
+        indexes = [
+            models.Index(fields=['month', 'course']),
+        ]
+
+    @property
+    def total(self):
+        return self.present + self.absent + self.excused
+
+    def __str__(self):
+        return f"{self.member} - {self.course.name} - {self.month:%Y-%m}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Course, Session, Attendance
+from .models import Course, Holiday, Session, Attendance
 from core.serializers import MemberSerializer
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -10,6 +10,20 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class AttendanceSerializer(serializers.ModelSerializer):
+    """
+    Représentation compacte d'une présence (feuille d'appel).
+    """
+    member_name = serializers.SerializerMethodField()
+    belt = serializers.CharField(source='member.belt', read_only=True)
+
+    class Meta:
+        model = Attendance
+        fields = ['id', 'member', 'member_name', 'belt', 'status']
+
+    def get_member_name(self, obj):
+        return f"{obj.member.first_name} {obj.member.last_name}"
+
+class AttendanceDetailSerializer(serializers.ModelSerializer):
     member_details = MemberSerializer(source='member', read_only=True)
 
     class Meta:
@@ -23,3 +37,36 @@ class SessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Session
         fields = ['id', 'course', 'course_name', 'date', 'notes', 'attendances']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Fiche membre complète uniquement sur demande (?expand=member)
+        if self.context.get('expand_members'):
+            fields['attendances'] = AttendanceDetailSerializer(many=True, read_only=True)
+        return fields
+
+class CalendarSessionSerializer(serializers.ModelSerializer):
+    """
+    Séance sans les présences, pour l'affichage calendrier.
+    """
+    course_name = serializers.CharField(source='course.name', read_only=True)
+    start_time = serializers.TimeField(source='course.start_time', read_only=True)
+    end_time = serializers.TimeField(source='course.end_time', read_only=True)
+    attendance_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Session
+        fields = ['id', 'course', 'course_name', 'date', 'start_time', 'end_time', 'notes', 'attendance_count']
+
+class HolidaySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Holiday
+        fields = '__all__'
+
+class SyncAttendanceSerializer(serializers.ModelSerializer):
+    """
+    Présence telle qu'échangée avec un client hors ligne.
+    """
+    class Meta:
+        model = Attendance
+        fields = ['id', 'session', 'member', 'status', 'changed_at', 'updated_at']
@@ -0,0 +1,385 @@
+import logging
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from core.models import Member, Registration
+from .models import Attendance, AttendanceRollup, Course, Holiday, Session
+
+logger = logging.getLogger(__name__)
+
+STATUSES = {value for value, _ in Attendance.STATUS_CHOICES}
+
+
+class AttendanceRecorder:
+    """
+    Service d'enregistrement groupé des présences d'une séance.
+    """
+
+    @staticmethod
+    def mark(session, rows):
+        """
+        Valide toutes les lignes en une passe puis les écrit en un seul upsert.
+        Retourne un résultat par ligne, dans l'ordre reçu : 'created', 'updated' ou 'invalid'.
+        """
+        results = [{'member_id': row.get('member_id') if isinstance(row, dict) else None} for row in rows]
+        candidates = {}
+
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                results[index]['error'] = 'Ligne invalide'
+                continue
+            try:
+                member_id = int(row.get('member_id'))
+            except (TypeError, ValueError):
+                results[index]['error'] = 'member_id invalide'
+                continue
+            if row.get('status') not in STATUSES:
+                results[index]['error'] = f"Statut invalide : {row.get('status')}"
+                continue
+            if member_id in candidates:
+                # La dernière ligne reçue pour un membre l'emporte
+                results[candidates[member_id][0]]['error'] = 'Membre en double'
+            results[index]['member_id'] = member_id
+            candidates[member_id] = (index, row['status'])
+
+        known = set(Member.objects.filter(id__in=candidates).values_list('id', flat=True))
+        for member_id in set(candidates) - known:
+            index, _ = candidates.pop(member_id)
+            results[index]['error'] = 'Membre introuvable'
+
+        existing = set(
+            Attendance.objects.filter(session=session, member_id__in=candidates).values_list('member_id', flat=True)
+        )
+        now = timezone.now()
+        with transaction.atomic():
+            Attendance.objects.bulk_create(
+                [Attendance(session=session, member_id=member_id, status=status_val, changed_at=now)
+                 for member_id, (_, status_val) in candidates.items()],
+                update_conflicts=True,
+                unique_fields=['session', 'member'],
+                update_fields=['status', 'changed_at', 'updated_at'],
+            )
+            if candidates:
+                AttendanceRollupService.schedule_refresh(session.course_id, session.date, list(candidates))
+
+        for member_id, (index, status_val) in candidates.items():
+            results[index]['status'] = status_val
+            results[index]['outcome'] = 'updated' if member_id in existing else 'created'
+        for result in results:
+            if 'error' in result:
+                result['outcome'] = 'invalid'
+        return results
+
+
+class AttendanceSync:
+    """
+    Synchronisation des présences avec un client hors ligne (file de modifications horodatées).
+    """
+
+    PAGE_SIZE = 500
+
+    @staticmethod
+    def encode_cursor(attendance):
+        return f"{attendance.updated_at.isoformat()}_{attendance.id}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Retourne (updated_at, id) ou lève ValueError.
+        """
+        stamp, _, pk = cursor.rpartition('_')
+        updated_at = parse_datetime(stamp)
+        if updated_at is None:
+            raise ValueError(cursor)
+        return updated_at, int(pk)
+
+    @staticmethod
+    def changes_since(cursor=None, limit=PAGE_SIZE):
+        """
+        Présences écrites après le curseur, dans l'ordre (updated_at, id).
+        Retourne (présences, curseur suivant, reste_des_données).
+
+        updated_at est fixé avant l'écriture : une transaction validée plus tard qu'une autre
+        peut rendre visible une présence plus ancienne que le curseur d'un client. Le curseur
+        n'avance donc jamais au-delà de maintenant - ATTENDANCE_SYNC_SAFETY_WINDOW ; les présences
+        plus récentes sont renvoyées en fin de delta mais relues au prochain appel
+        (sans effet côté client : c'est le même état).
+        """
+        watermark = timezone.now() - timedelta(seconds=settings.ATTENDANCE_SYNC_SAFETY_WINDOW)
+        attendances = Attendance.objects.order_by('updated_at', 'id')
+        if cursor:
+            updated_at, pk = AttendanceSync.decode_cursor(cursor)
+            attendances = attendances.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+        page = list(attendances.filter(updated_at__lte=watermark)[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = AttendanceSync.encode_cursor(page[-1]) if page else cursor
+        if not has_more and len(page) < limit:
+            page += list(attendances.filter(updated_at__gt=watermark)[:limit - len(page)])
+        return page, next_cursor, has_more
+
+    @staticmethod
+    def apply(changes):
+        """
+        Applique un lot de modifications {session, member, status, changed_at}.
+        Une modification n'est retenue que si elle est plus récente que la valeur enregistrée :
+        rejouer un lot déjà appliqué est sans effet. Retourne un résultat par modification :
+        'applied', 'stale' (une version plus récente existe) ou 'invalid'.
+        """
+        results = [{} for _ in changes]
+        candidates = {}
+
+        for index, change in enumerate(changes):
+            if not isinstance(change, dict):
+                results[index]['error'] = 'Ligne invalide'
+                continue
+            try:
+                key = (int(change.get('session')), int(change.get('member')))
+            except (TypeError, ValueError):
+                results[index]['error'] = 'session ou member invalide'
+                continue
+            results[index].update(session=key[0], member=key[1])
+            changed_at = change.get('changed_at')
+            changed_at = parse_datetime(changed_at) if isinstance(changed_at, str) else None
+            if changed_at is None:
+                results[index]['error'] = 'changed_at invalide'
+                continue
+            if timezone.is_naive(changed_at):
+                changed_at = timezone.make_aware(changed_at)
+            if change.get('status') not in STATUSES:
+                results[index]['error'] = f"Statut invalide : {change.get('status')}"
+                continue
+            # Plusieurs modifications d'une même présence dans le lot : la plus récente l'emporte
+            if key in candidates and candidates[key][1] > changed_at:
+                results[index]['outcome'] = 'stale'
+                continue
+            if key in candidates:
+                results[candidates[key][0]]['outcome'] = 'stale'
+            candidates[key] = (index, changed_at, change['status'])
+
+        session_ids = {session_id for session_id, _ in candidates}
+        member_ids = {member_id for _, member_id in candidates}
+        sessions = {s['id']: s for s in Session.objects.filter(id__in=session_ids).values('id', 'course_id', 'date')}
+        known_members = set(Member.objects.filter(id__in=member_ids).values_list('id', flat=True))
+        for key in list(candidates):
+            if key[0] not in sessions or key[1] not in known_members:
+                index = candidates.pop(key)[0]
+                results[index]['error'] = 'Séance ou membre introuvable'
+
+        with transaction.atomic():
+            existing = {
+                (row['session_id'], row['member_id']): row['changed_at']
+                for row in Attendance.objects.select_for_update()
+                .filter(session_id__in=session_ids, member_id__in=member_ids)
+                .values('session_id', 'member_id', 'changed_at')
+            }
+            winners = []
+            for key, (index, changed_at, status_val) in candidates.items():
+                current = existing.get(key)
+                if current is not None and current >= changed_at:
+                    results[index]['outcome'] = 'stale'
+                    continue
+                results[index]['outcome'] = 'applied'
+                winners.append(Attendance(session_id=key[0], member_id=key[1], status=status_val, changed_at=changed_at))
+
+            Attendance.objects.bulk_create(
+                winners,
+                update_conflicts=True,
+                unique_fields=['session', 'member'],
+                update_fields=['status', 'changed_at', 'updated_at'],
+            )
+
+            touched = {}
+            for attendance in winners:
+                session = sessions[attendance.session_id]
+                touched.setdefault((session['course_id'], AttendanceRollupService.month_of(session['date'])), []).append(attendance.member_id)
+            for (course_id, month), members in touched.items():
+                AttendanceRollupService.schedule_refresh(course_id, month, members)
+
+        for result in results:
+            if 'error' in result:
+                result['outcome'] = 'invalid'
+        return results
+
+
+class AttendanceRollupService:
+    """
+    Maintenance des compteurs AttendanceRollup (membre x cours x mois).
+    """
+
+    COUNTS = {
+        'present': Count('id', filter=Q(status='PRESENT')),
+        'absent': Count('id', filter=Q(status='ABSENT')),
+        'excused': Count('id', filter=Q(status='EXCUSED')),
+    }
+
+    @staticmethod
+    def month_of(day):
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        return day.replace(day=1)
+
+    @staticmethod
+    def schedule_refresh(course_id, day, member_ids=None):
+        """
+        Planifie le recalcul des compteurs concernés une fois la transaction validée
+        (tous les membres du cours si member_ids est None). Une erreur du broker est
+        journalisée sans faire échouer l'écriture, déjà validée : les compteurs seront
+        corrigés par rebuild_attendance_rollups.
+        """
+        from .tasks import refresh_attendance_rollups
+
+        month = AttendanceRollupService.month_of(day).isoformat()
+
+        def enqueue():
+            try:
+                refresh_attendance_rollups.delay(course_id, month, member_ids)
+            except Exception:
+                logger.exception(f"Could not schedule attendance rollup refresh for course {course_id} ({month})")
+
+        transaction.on_commit(enqueue)
+
+    @staticmethod
+    def refresh(course_id, month, member_ids=None):
+        """
+        Recalcule les compteurs d'un cours pour un mois, éventuellement limités à quelques membres.
+        Seules les présences de ce mois sont relues : le coût ne dépend pas de l'historique.
+        """
+        month = AttendanceRollupService.month_of(month)
+        next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        attendances = Attendance.objects.filter(
+            session__course_id=course_id, session__date__gte=month, session__date__lt=next_month,
+        )
+        rollups = AttendanceRollup.objects.filter(course_id=course_id, month=month)
+        if member_ids is not None:
+            attendances = attendances.filter(member_id__in=member_ids)
+            rollups = rollups.filter(member_id__in=member_ids)
+
+        rows = [
+            AttendanceRollup(course_id=course_id, month=month, **row)
+            for row in attendances.values('member_id').annotate(**AttendanceRollupService.COUNTS)
+        ]
+        with transaction.atomic():
+            # Membres qui n'ont plus aucune présence ce mois-ci
+            rollups.exclude(member_id__in=[row.member_id for row in rows]).delete()
+            AttendanceRollupService.upsert(rows)
+        return len(rows)
+
+    @staticmethod
+    def rebuild(batch_size=1000):
+        """
+        Reconstruit toute la table à partir des présences (une requête agrégée).
+        """
+        rows = (
+            Attendance.objects
+            .annotate(month=TruncMonth('session__date'))
+            .values('member_id', 'session__course_id', 'month')
+            .annotate(**AttendanceRollupService.COUNTS)
+            .order_by()
+        )
+        with transaction.atomic():
+            AttendanceRollup.objects.all().delete()
+            batch, total = [], 0
+            for row in rows.iterator(chunk_size=batch_size):
+                row['course_id'] = row.pop('session__course_id')
+                batch.append(AttendanceRollup(**row))
+                if len(batch) >= batch_size:
+                    total += AttendanceRollupService.upsert(batch)
+                    batch = []
+            total += AttendanceRollupService.upsert(batch)
+        return total
+
+    @staticmethod
+    def upsert(rows):
+        AttendanceRollup.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['member', 'course', 'month'],
+            update_fields=['present', 'absent', 'excused', 'updated_at'],
+        )
+        return len(rows)
+
+
+class SessionGenerator:
+    """
+    Génère à l'avance les séances d'une saison à partir du planning hebdomadaire des cours.
+    """
+
+    @staticmethod
+    def dates_for(course, start, end, closed_days):
+        day = start + timedelta(days=(course.day_of_week - start.weekday()) % 7)
+        while day <= end:
+            if day not in closed_days:
+                yield day
+            day += timedelta(weeks=1)
+
+    @staticmethod
+    def closed_days(start, end):
+        closed = set()
+        for holiday in Holiday.objects.filter(start_date__lte=end, end_date__gte=start):
+            day = max(holiday.start_date, start)
+            while day <= min(holiday.end_date, end):
+                closed.add(day)
+                day += timedelta(days=1)
+        return closed
+
+    @staticmethod
+    def generate(start, end, courses=None, batch_size=1000):
+        """
+        Crée les séances manquantes entre deux dates (incluses) pour les cours donnés (tous par défaut).
+        Les séances existantes sont conservées. Retourne le nombre de séances créées.
+        """
+        courses = list(courses if courses is not None else Course.objects.all())
+        closed_days = SessionGenerator.closed_days(start, end)
+        existing = set(
+            Session.objects.filter(course__in=courses, date__gte=start, date__lte=end).values_list('course_id', 'date')
+        )
+        sessions = [
+            Session(course=course, date=day)
+            for course in courses
+            for day in SessionGenerator.dates_for(course, start, end, closed_days)
+            if (course.id, day) not in existing
+        ]
+        Session.objects.bulk_create(sessions, batch_size=batch_size, ignore_conflicts=True)
+        return len(sessions)
+
+
+class CourseRoster:
+    """
+    Élèves attendus à un cours : inscrits de la saison (hors refusés) dont la discipline
+    et la catégorie correspondent au cours.
+    """
+
+    @staticmethod
+    def members(course, season):
+        """
+        Retourne les élèves éligibles en une seule requête (index season/category).
+        """
+        restricted = Course.categories.through.objects.filter(course_id=course.id)
+        registrations = (
+            Registration.objects
+            .filter(season=season)
+            .exclude(status='REJECTED')
+            .filter(Q(category__in=restricted.values('category_id')) | ~Exists(restricted))
+        )
+        if course.discipline:
+            registrations = registrations.filter(member__discipline=course.discipline)
+
+        return [
+            {
+                'id': row['member_id'],
+                'first_name': row['member__first_name'],
+                'last_name': row['member__last_name'],
+                'belt': row['member__belt'],
+                'birth_date': row['member__birth_date'],
+                'category': row['category_id'],
+            }
+            for row in registrations.values(
+                'member_id', 'member__first_name', 'member__last_name', 'member__belt',
+                'member__birth_date', 'category_id',
+            ).order_by('member__last_name', 'member__first_name')
+        ]
@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from core.models import Member, Registration
+from .cache import invalidate_rosters
+from .models import Attendance, Course, Session
+from .services import AttendanceRollupService
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_rosters_on_change(sender, instance, **kwargs):
+    # Après validation : une requête concurrente ne doit pas remettre en cache l'ancienne liste
+    transaction.on_commit(invalidate_rosters)
+
+
+@receiver(m2m_changed, sender=Course.categories.through)
+def invalidate_rosters_on_categories_change(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(invalidate_rosters)
+
+
+# --- Compteurs de présences (AttendanceRollup) ---
+# L'enregistrement groupé (AttendanceRecorder, AttendanceSync) planifie lui-même le recalcul ;
+# ces signaux couvrent les écritures unitaires (admin) et les suppressions, y compris en cascade.
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_rollup_on_attendance_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    session = Session.objects.filter(pk=instance.session_id).values('course_id', 'date').first()
+    # Séance supprimée en cascade : recalculée par refresh_rollups_on_session_delete
+    if session:
+        AttendanceRollupService.schedule_refresh(session['course_id'], session['date'], [instance.member_id])
+
+
+@receiver(pre_save, sender=Session)
+def remember_previous_slot(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    instance._previous_slot = Session.objects.filter(pk=instance.pk).values_list('course_id', 'date').first()
+
+
+@receiver(post_save, sender=Session)
+def refresh_rollups_on_session_move(sender, instance, raw=False, **kwargs):
+    """
+    Une séance changée de cours ou de date déplace ses présences : l'ancien et le nouveau mois sont recalculés.
+    """
+    previous_slot = getattr(instance, '_previous_slot', None)
+    if raw or not previous_slot:
+        return
+    course_id, day = previous_slot
+    if (course_id, AttendanceRollupService.month_of(day)) != (instance.course_id, AttendanceRollupService.month_of(instance.date)):
+        AttendanceRollupService.schedule_refresh(course_id, day)
+        AttendanceRollupService.schedule_refresh(instance.course_id, instance.date)
+
+
+@receiver(post_delete, sender=Session)
+def refresh_rollups_on_session_delete(sender, instance, **kwargs):
+    AttendanceRollupService.schedule_refresh(instance.course_id, instance.date)
@@ -0,0 +1,10 @@
+from celery import shared_task
+from .services import AttendanceRollupService
+
+
+@shared_task
+def refresh_attendance_rollups(course_id, month, member_ids=None):
+    """
+    Recalcule les compteurs de présences d'un cours pour un mois donné.
+    """
+    return AttendanceRollupService.refresh(course_id, month, member_ids)
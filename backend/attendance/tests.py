@@ -0,0 +1,389 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Category, Member, Registration, Season
+from .models import Attendance, AttendanceRollup, Course, Holiday, Session
+from .services import AttendanceRollupService
+from .tasks import refresh_attendance_rollups
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class MarkAttendanceTest(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Judo Enfants', day_of_week=2, start_time='17:00', end_time='18:00')
+        self.session = Session.objects.create(course=course, date='2024-10-02')
+        parent = User.objects.create(username='parent', email='parent@test.com')
+        self.members = [
+            Member.objects.create(first_name=f'Kid{i}', last_name='Test', birth_date='2012-01-01', parent=parent)
+            for i in range(40)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+        self.url = f'/api/sessions/{self.session.id}/mark_attendance/'
+
+    def test_bulk_upsert_in_constant_queries(self):
+        Attendance.objects.create(session=self.session, member=self.members[0], status='ABSENT')
+        payload = [{'member_id': m.id, 'status': 'PRESENT'} for m in self.members]
+
+        # session + membres + présences existantes + savepoint/upsert
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, {'attendances': payload}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['invalid']), (39, 1, 0))
+        self.assertEqual(response.data['results'][0]['outcome'], 'updated')
+        self.assertEqual(Attendance.objects.filter(session=self.session, status='PRESENT').count(), 40)
+
+    def test_invalid_rows_are_reported(self):
+        payload = [
+            {'member_id': self.members[0].id, 'status': 'PRESENT'},
+            {'member_id': self.members[1].id, 'status': 'LATE'},
+            {'member_id': 999999, 'status': 'PRESENT'},
+            {'member_id': 'abc', 'status': 'PRESENT'},
+            {'member_id': self.members[0].id, 'status': 'EXCUSED'},
+        ]
+        response = self.client.post(self.url, {'attendances': payload}, format='json')
+
+        outcomes = [row['outcome'] for row in response.data['results']]
+        self.assertEqual(outcomes, ['invalid', 'invalid', 'invalid', 'invalid', 'created'])
+        self.assertEqual(response.data['results'][2]['error'], 'Membre introuvable')
+        self.assertEqual(Attendance.objects.get().status, 'EXCUSED')
+
+    def test_payload_must_be_a_list(self):
+        response = self.client.post(self.url, {'attendances': 'oops'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SessionSerializationTest(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Judo Enfants', day_of_week=2, start_time='17:00', end_time='18:00')
+        self.session = Session.objects.create(course=course, date='2024-10-02')
+        for i in range(10):
+            parent = User.objects.create(username=f'parent{i}', email=f'parent{i}@test.com')
+            member = Member.objects.create(first_name=f'Kid{i}', last_name='Test', birth_date='2012-01-01',
+                                           parent=parent, belt='YELLOW')
+            Attendance.objects.create(session=self.session, member=member)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+        self.url = f'/api/sessions/{self.session.id}/'
+
+    def test_compact_attendances(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        attendance = response.data['attendances'][0]
+        self.assertEqual(set(attendance), {'id', 'member', 'member_name', 'belt', 'status'})
+        self.assertEqual(attendance['member_name'], 'Kid0 Test')
+        self.assertEqual(attendance['belt'], 'YELLOW')
+
+    def test_expanded_attendances(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'expand': 'member'})
+
+        attendance = response.data['attendances'][0]
+        self.assertEqual(attendance['member_details']['first_name'], 'Kid0')
+        self.assertIn('parent', attendance['member_details'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AttendanceRollupTest(TestCase):
+    def setUp(self):
+        self.season = Season.objects.create(name='2024-2025', start_date='2024-09-01', end_date='2025-06-30', is_active=True)
+        self.course = Course.objects.create(name='Judo Enfants', day_of_week=2, start_time='17:00', end_time='18:00')
+        parent = User.objects.create(username='parent', email='parent@test.com')
+        self.members = [
+            Member.objects.create(first_name=f'Kid{i}', last_name='Test', birth_date='2012-01-01', parent=parent)
+            for i in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+
+    def mark(self, day, statuses):
+        session, _ = Session.objects.get_or_create(course=self.course, date=day)
+        payload = [{'member_id': m.id, 'status': s} for m, s in zip(self.members, statuses)]
+        with mock.patch('attendance.tasks.refresh_attendance_rollups.delay', side_effect=refresh_attendance_rollups), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/sessions/{session.id}/mark_attendance/', {'attendances': payload}, format='json')
+
+    def test_mark_attendance_refreshes_rollups(self):
+        self.mark('2024-10-02', ['PRESENT', 'ABSENT'])
+        self.mark('2024-10-09', ['PRESENT', 'EXCUSED'])
+        self.mark('2024-11-06', ['PRESENT', 'PRESENT'])
+        # Correction d'une feuille déjà saisie
+        self.mark('2024-10-09', ['ABSENT', 'EXCUSED'])
+
+        rollup = AttendanceRollup.objects.get(member=self.members[0], month=date(2024, 10, 1))
+        self.assertEqual((rollup.present, rollup.absent, rollup.excused), (1, 1, 0))
+        self.assertEqual(AttendanceRollup.objects.count(), 4)
+
+        refreshed = list(AttendanceRollup.objects.values_list('member', 'month', 'present', 'absent', 'excused').order_by('pk'))
+        AttendanceRollupService.rebuild()
+        self.assertCountEqual(
+            refreshed,
+            AttendanceRollup.objects.values_list('member', 'month', 'present', 'absent', 'excused'),
+        )
+
+    def rollups(self):
+        return set(AttendanceRollup.objects.values_list('member', 'course', 'month', 'present', 'absent', 'excused'))
+
+    def test_deletes_and_moves_refresh_rollups(self):
+        self.mark('2024-10-02', ['PRESENT', 'ABSENT'])
+        self.mark('2024-10-09', ['PRESENT', 'PRESENT'])
+        session = Session.objects.get(date='2024-10-09')
+        refresh = mock.patch('attendance.tasks.refresh_attendance_rollups.delay', side_effect=refresh_attendance_rollups)
+
+        with refresh, self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.get(session=session, member=self.members[0]).delete()
+        with refresh, self.captureOnCommitCallbacks(execute=True):
+            session.date = date(2024, 11, 6)
+            session.save()
+        expected = self.rollups()
+        AttendanceRollupService.rebuild()
+        self.assertEqual(expected, self.rollups())
+        self.assertTrue(AttendanceRollup.objects.filter(month=date(2024, 11, 1)).exists())
+
+        with refresh, self.captureOnCommitCallbacks(execute=True):
+            Session.objects.filter(date='2024-10-02').delete()
+        self.assertFalse(AttendanceRollup.objects.filter(month=date(2024, 10, 1)).exists())
+
+    def test_broker_error_does_not_fail_the_write(self):
+        self.mark('2024-10-02', ['PRESENT', 'ABSENT'])
+        with mock.patch('attendance.tasks.refresh_attendance_rollups.delay', side_effect=OSError('broker down')), \
+                self.assertLogs('attendance.services', level='ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.filter(member=self.members[0]).get().delete()
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_statistics_endpoint(self):
+        self.mark('2024-10-02', ['PRESENT', 'ABSENT'])
+        self.mark('2024-11-06', ['PRESENT', 'PRESENT'])
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/attendance/statistics/', {'group_by': 'member'})
+        first = response.data['results'][0]
+        self.assertEqual((first['present_count'], first['total'], first['rate']), (2, 2, 1.0))
+
+        months = self.client.get('/api/attendance/statistics/', {'group_by': 'month'}).data['results']
+        self.assertEqual([(row['month'], row['rate']) for row in months], [(date(2024, 10, 1), 0.5), (date(2024, 11, 1), 1.0)])
+
+        response = self.client.get('/api/attendance/statistics/', {'group_by': 'teacher'})
+        self.assertEqual(response.status_code, 400)
+        for params in ({'season_id': 'abc'}, {'course': 'x'}, {'member': '1.5'}):
+            self.assertEqual(self.client.get('/api/attendance/statistics/', params).status_code, 400)
+
+        self.assertEqual(APIClient().get('/api/attendance/statistics/').status_code, 401)
+
+        response = self.client.get('/api/attendance/statistics/', {'member': self.members[1].id})
+        self.assertEqual([row['member_id'] for row in response.data['results']], [self.members[1].id])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SessionGenerationTest(TestCase):
+    def setUp(self):
+        self.season = Season.objects.create(name='2024-2025', start_date='2024-09-01', end_date='2024-10-31', is_active=True)
+        # Mercredi et samedi
+        self.wednesday = Course.objects.create(name='Judo Enfants', day_of_week=2, start_time='17:00', end_time='18:00')
+        self.saturday = Course.objects.create(name='Judo Adultes', day_of_week=5, start_time='10:00', end_time='11:30')
+        Holiday.objects.create(name='Toussaint', start_date='2024-10-19', end_date='2024-11-03')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+
+    def test_generate_skips_holidays_and_existing(self):
+        Session.objects.create(course=self.wednesday, date='2024-09-04')
+
+        response = self.client.post('/api/sessions/generate/', {}, format='json')
+
+        # Avant la Toussaint : 7 mercredis (dont un existant) et 6 samedis
+        self.assertEqual(response.data['created'], 12)
+        self.assertEqual(Session.objects.count(), 13)
+        self.assertFalse(Session.objects.filter(date__gte='2024-10-19').exists())
+        self.assertEqual(self.client.post('/api/sessions/generate/', {}, format='json').data['created'], 0)
+
+    def test_calendar_in_one_query(self):
+        call_command('generate_sessions', stdout=StringIO())
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/sessions/calendar/', {'start': '2024-09-01', 'end': '2024-09-30'})
+
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(response.data[0]['date'], '2024-09-04')
+        self.assertEqual(response.data[0]['start_time'], '17:00:00')
+        self.assertEqual(response.data[0]['attendance_count'], 0)
+
+        response = self.client.get('/api/sessions/calendar/', {'start': '2024-09-01', 'end': '2024-09-30', 'course': self.saturday.id})
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(self.client.get('/api/sessions/calendar/', {'start': '2024-09-30'}).status_code, 400)
+        response = self.client.get('/api/sessions/calendar/', {'start': '2024-09-01', 'end': '2024-09-30', 'course': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/sessions/generate/', {'season_id': 'abc'}, format='json').status_code, 400)
+        response = self.client.get('/api/sessions/get_by_date_and_course/', {'date': '2024-09-04', 'course_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_holidays_are_admin_only_for_writes(self):
+        anonymous = APIClient()
+        self.assertEqual(len(anonymous.get('/api/holidays/').data), 1)
+        payload = {'name': 'Noël', 'start_date': '2024-12-21', 'end_date': '2025-01-05'}
+        self.assertEqual(anonymous.post('/api/holidays/', payload, format='json').status_code, 401)
+
+        parent = APIClient()
+        parent.force_authenticate(User.objects.create(username='parent'))
+        self.assertEqual(parent.post('/api/holidays/', payload, format='json').status_code, 403)
+        self.assertEqual(self.client.post('/api/holidays/', payload, format='json').status_code, 201)
+
+    def test_get_by_date_and_course_is_read_only(self):
+        response = self.client.get('/api/sessions/get_by_date_and_course/', {'date': '2024-09-04', 'course_id': self.wednesday.id})
+
+        self.assertIsNone(response.data['id'])
+        self.assertEqual(response.data['attendances'], [])
+        self.assertFalse(Session.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CourseRosterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.season = Season.objects.create(name='2024-2025', start_date='2024-09-01', end_date='2025-06-30', is_active=True)
+        self.poussins = Category.objects.create(name='Poussins', code='POUSSIN', price=Decimal('200.00'))
+        self.benjamins = Category.objects.create(name='Benjamins', code='BENJAMIN', price=Decimal('220.00'))
+        self.course = Course.objects.create(name='Judo Poussins', day_of_week=2, start_time='17:00', end_time='18:00',
+                                            discipline='JUDO')
+        self.course.categories.add(self.poussins)
+        parent = User.objects.create(username='parent', email='parent@test.com')
+        self.expected = self.register(parent, 'Alice', self.poussins)
+        self.register(parent, 'Bruno', self.benjamins)
+        self.register(parent, 'Chloé', self.poussins, discipline='TAISO')
+        self.register(parent, 'David', self.poussins, status='REJECTED')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+        self.url = f'/api/courses/{self.course.id}/roster/'
+
+    def register(self, parent, first_name, category, discipline='JUDO', status='VALIDATED'):
+        member = Member.objects.create(first_name=first_name, last_name='Test', birth_date='2015-01-01',
+                                       parent=parent, discipline=discipline)
+        Registration.objects.create(member=member, season=self.season, category=category, status=status)
+        return member
+
+    def test_roster_filters_eligible_members(self):
+        # cours + saison + élèves
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual([m['id'] for m in response.data], [self.expected.id])
+        self.assertEqual(response.data[0]['category'], self.poussins.id)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_roster_without_restrictions(self):
+        self.course.categories.clear()
+        self.course.discipline = ''
+        self.course.save()
+
+        self.assertEqual(len(self.client.get(self.url).data), 3)
+
+    def test_roster_is_admin_only(self):
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+        parent = APIClient()
+        parent.force_authenticate(User.objects.create(username='other-parent'))
+        self.assertEqual(parent.get(self.url).status_code, 403)
+
+    def test_invalid_season(self):
+        self.assertEqual(self.client.get(self.url, {'season_id': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'season_id': self.season.id + 1}).data, [])
+
+    def test_roster_is_cached_and_invalidated(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.categories.add(self.benjamins)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AttendanceSyncTest(TestCase):
+    def setUp(self):
+        course = Course.objects.create(name='Judo Enfants', day_of_week=2, start_time='17:00', end_time='18:00')
+        self.session = Session.objects.create(course=course, date='2024-10-02')
+        parent = User.objects.create(username='parent', email='parent@test.com')
+        self.members = [
+            Member.objects.create(first_name=f'Kid{i}', last_name='Test', birth_date='2012-01-01', parent=parent)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+        self.url = '/api/attendance/sync/'
+
+    def change(self, member, status, changed_at):
+        return {'session': self.session.id, 'member': member.id, 'status': status, 'changed_at': changed_at}
+
+    def test_batch_is_idempotent_and_last_writer_wins(self):
+        changes = [
+            self.change(self.members[0], 'ABSENT', '2024-10-02T17:05:00Z'),
+            self.change(self.members[0], 'PRESENT', '2024-10-02T17:10:00Z'),
+            self.change(self.members[1], 'EXCUSED', '2024-10-02T17:05:00Z'),
+            self.change(self.members[2], 'LATE', '2024-10-02T17:05:00Z'),
+        ]
+        response = self.client.post(self.url, {'changes': changes}, format='json')
+
+        self.assertEqual([r['outcome'] for r in response.data['results']], ['stale', 'applied', 'applied', 'invalid'])
+        self.assertEqual(Attendance.objects.get(member=self.members[0]).status, 'PRESENT')
+        self.assertEqual(len(response.data['changes']), 2)
+
+        # Rejeu du même lot (connexion perdue avant la réponse)
+        response = self.client.post(self.url, {'changes': changes}, format='json')
+        self.assertEqual([r['outcome'] for r in response.data['results']], ['stale', 'stale', 'stale', 'invalid'])
+
+        # Une modification plus ancienne venant d'un autre appareil ne l'emporte pas
+        self.client.post(self.url, {'changes': [self.change(self.members[0], 'ABSENT', '2024-10-02T17:07:00Z')]}, format='json')
+        self.assertEqual(Attendance.objects.get(member=self.members[0]).status, 'PRESENT')
+
+    @override_settings(ATTENDANCE_SYNC_SAFETY_WINDOW=0)
+    def test_delta_since_cursor(self):
+        self.client.post(self.url, {'changes': [
+            self.change(member, 'PRESENT', '2024-10-02T17:05:00Z') for member in self.members
+        ]}, format='json')
+
+        first = self.client.get(self.url, {'limit': 2}).data
+        self.assertEqual(len(first['changes']), 2)
+        self.assertTrue(first['has_more'])
+        second = self.client.get(self.url, {'since': first['cursor'], 'limit': 2}).data
+        self.assertEqual(len(second['changes']), 1)
+        self.assertFalse(second['has_more'])
+
+        # Seule la présence modifiée revient dans le delta suivant
+        response = self.client.post(self.url, {
+            'since': second['cursor'],
+            'changes': [self.change(self.members[1], 'ABSENT', '2024-10-02T17:20:00Z')],
+        }, format='json')
+        self.assertEqual([(c['member'], c['status']) for c in response.data['changes']], [(self.members[1].id, 'ABSENT')])
+
+        self.assertEqual(self.client.get(self.url, {'since': 'nope'}).status_code, 400)
+
+    def test_recent_changes_are_reread(self):
+        self.client.post(self.url, {'changes': [
+            self.change(member, 'PRESENT', '2024-10-02T17:05:00Z') for member in self.members[:2]
+        ]}, format='json')
+        Attendance.objects.filter(member=self.members[0]).update(updated_at=timezone.now() - timedelta(minutes=5))
+
+        first = self.client.get(self.url).data
+        self.assertEqual([c['member'] for c in first['changes']], [self.members[0].id, self.members[1].id])
+        self.assertFalse(first['has_more'])
+
+        # Présence validée en retard avec un updated_at antérieur à la présence récente :
+        # elle reste visible car le curseur n'a pas dépassé la fenêtre de sécurité
+        late = Attendance.objects.create(session=self.session, member=self.members[2], status='ABSENT')
+        Attendance.objects.filter(id=late.id).update(updated_at=timezone.now() - timedelta(seconds=30))
+        second = self.client.get(self.url, {'since': first['cursor']}).data
+        self.assertEqual({c['member'] for c in second['changes']}, {self.members[1].id, self.members[2].id})
+        self.assertEqual(second['cursor'], first['cursor'])
@@ -1,15 +1,45 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, views, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db.models import Count, F, Prefetch, Sum
 from django.shortcuts import get_object_or_404
-from .models import Course, Session, Attendance
-from .serializers import CourseSerializer, SessionSerializer, AttendanceSerializer
-from core.models import Member
+from django.utils.dateparse import parse_date
+from .models import Course, Holiday, Session, Attendance, AttendanceRollup
+from .serializers import CalendarSessionSerializer, CourseSerializer, HolidaySerializer, SessionSerializer, SyncAttendanceSerializer
+from .cache import get_course_roster
+from .services import AttendanceRecorder, AttendanceSync, SessionGenerator
+from core.models import Member, Season
+
+MAX_CALENDAR_DAYS = 366
+
+def int_params(request, *names):
+    """
+    Paramètres entiers optionnels de la requête (None si absents).
+    Lève ValueError si l'un d'eux n'est pas un entier.
+    """
+    return [int(request.query_params[name]) if request.query_params.get(name) else None for name in names]
 
 class CourseViewSet(viewsets.ModelViewSet):
-    queryset = Course.objects.all()
+    queryset = Course.objects.prefetch_related('categories')
     serializer_class = CourseSerializer
 
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def roster(self, request, pk=None):
+        """
+        Élèves attendus au cours pour une saison (active par défaut), mis en cache par cours et saison.
+        """
+        course = get_object_or_404(Course, pk=pk)
+        try:
+            season_id, = int_params(request, 'season_id')
+        except ValueError:
+            return Response({'error': 'season_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        season = Season.objects.filter(pk=season_id).first() if season_id else Season.objects.filter(is_active=True).first()
+        if season is None:
+            return Response([])
+
+        members, hit = get_course_roster(course, season)
+        return Response(members, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
     def list(self, request, *args, **kwargs):
         try:
             return super().list(request, *args, **kwargs)
@@ -18,35 +48,206 @@ class CourseViewSet(viewsets.ModelViewSet):
             traceback.print_exc()
             return Response({'error': str(e), 'traceback': traceback.format_exc()}, status=status.HTTP_400_BAD_REQUEST)
 
+class HolidayViewSet(viewsets.ModelViewSet):
+    """
+    Vacances et jours fériés (ignorés par la génération des séances).
+    Lecture ouverte, modification réservée aux administrateurs.
+    """
+    queryset = Holiday.objects.all()
+    serializer_class = HolidaySerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_permissions(self):
+        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+            return [permissions.IsAdminUser()]
+        return super().get_permissions()
+
 class SessionViewSet(viewsets.ModelViewSet):
-    queryset = Session.objects.all()
+    queryset = Session.objects.select_related('course').prefetch_related(
+        Prefetch('attendances', queryset=Attendance.objects.select_related('member'))
+    )
     serializer_class = SessionSerializer
 
+    def expand_members(self):
+        return 'member' in self.request.query_params.get('expand', '').split(',')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand_members'] = self.expand_members()
+        return context
+
+    def get_queryset(self):
+        if self.action == 'mark_attendance':
+            # Les présences existantes ne sont pas renvoyées : inutile de les précharger
+            return Session.objects.all()
+        if self.expand_members():
+            return Session.objects.select_related('course').prefetch_related(
+                Prefetch('attendances', queryset=Attendance.objects.select_related('member__parent'))
+            )
+        return super().get_queryset()
+
     @action(detail=False, methods=['get'])
     def get_by_date_and_course(self, request):
-        date = request.query_params.get('date')
-        course_id = request.query_params.get('course_id')
+        date = parse_date(request.query_params.get('date') or '')
+        try:
+            course_id, = int_params(request, 'course_id')
+        except ValueError:
+            course_id = None
 
         if not date or not course_id:
             return Response({'error': 'Date and course_id are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        session, created = Session.objects.get_or_create(date=date, course_id=course_id)
+        session = self.get_queryset().filter(date=date, course_id=course_id).first()
+        if session is None:
+            # Lecture seule : la séance est créée à l'enregistrement de la feuille (ou pré-générée)
+            return Response({'id': None, 'course': course_id, 'date': date.isoformat(), 'notes': '', 'attendances': []})
         serializer = self.get_serializer(session)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """
+        Séances comprises entre `start` et `end` (incluses), en une seule requête.
+        """
+        start = parse_date(request.query_params.get('start') or '')
+        end = parse_date(request.query_params.get('end') or '')
+        try:
+            course_id, = int_params(request, 'course')
+        except ValueError:
+            return Response({'error': 'course must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not start or not end or end < start:
+            return Response({'error': 'Valid start and end dates are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > MAX_CALENDAR_DAYS:
+            return Response({'error': f'Date range cannot exceed {MAX_CALENDAR_DAYS} days'}, status=status.HTTP_400_BAD_REQUEST)
+
+        sessions = (
+            Session.objects.filter(date__gte=start, date__lte=end)
+            .select_related('course')
+            .annotate(attendance_count=Count('attendances'))
+            .order_by('date', 'course__start_time')
+        )
+        if course_id:
+            sessions = sessions.filter(course_id=course_id)
+        return Response(CalendarSessionSerializer(sessions, many=True).data)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def generate(self, request):
+        """
+        Pré-génère les séances d'une saison (active par défaut) à partir du planning des cours.
+        """
+        season_id = request.data.get('season_id')
+        try:
+            season_id = int(season_id) if season_id else None
+        except (TypeError, ValueError):
+            return Response({'error': 'season_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        season = Season.objects.filter(pk=season_id).first() if season_id else Season.objects.filter(is_active=True).first()
+        if season is None:
+            return Response({'error': 'Season not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        created = SessionGenerator.generate(season.start_date, season.end_date)
+        return Response({'season': season.name, 'created': created})
+
     @action(detail=True, methods=['post'])
     def mark_attendance(self, request, pk=None):
         session = self.get_object()
         attendances_data = request.data.get('attendances', [])
+        if not isinstance(attendances_data, list):
+            return Response({'error': 'attendances must be a list'}, status=status.HTTP_400_BAD_REQUEST)
 
-        for item in attendances_data:
-            member_id = item.get('member_id')
-            status_val = item.get('status')
-            
-            Attendance.objects.update_or_create(
-                session=session,
-                member_id=member_id,
-                defaults={'status': status_val}
-            )
+        results = AttendanceRecorder.mark(session, attendances_data)
+        summary = {outcome: 0 for outcome in ('created', 'updated', 'invalid')}
+        for result in results:
+            summary[result['outcome']] += 1
+
+        return Response({'status': 'success', **summary, 'results': results})
+
+
+class AttendanceStatisticsView(views.APIView):
+    """
+    Taux de présence calculés à partir des compteurs précalculés (AttendanceRollup).
+    Paramètres :
+    - group_by : member, course ou month (défaut : member)
+    - season_id : saison (défaut : saison active)
+    - course, member : filtres optionnels
+    """
+    permission_classes = [permissions.IsAdminUser]
+    GROUPS = {
+        'member': ['member_id', 'member__first_name', 'member__last_name'],
+        'course': ['course_id', 'course__name'],
+        'month': ['month'],
+    }
+
+    def get(self, request):
+        group_by = request.query_params.get('group_by', 'member')
+        if group_by not in self.GROUPS:
+            return Response({'error': f"group_by must be one of {', '.join(self.GROUPS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            season_id, course_id, member_id = int_params(request, 'season_id', 'course', 'member')
+        except ValueError:
+            return Response({'error': 'season_id, course and member must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        season = Season.objects.filter(pk=season_id).first() if season_id else Season.objects.filter(is_active=True).first()
+        if season is None:
+            return Response({'season': None, 'group_by': group_by, 'results': []})
+
+        rollups = AttendanceRollup.objects.filter(month__gte=season.start_date.replace(day=1), month__lte=season.end_date)
+        if course_id:
+            rollups = rollups.filter(course_id=course_id)
+        if member_id:
+            rollups = rollups.filter(member_id=member_id)
+
+        rows = (
+            rollups.values(*self.GROUPS[group_by])
+            .annotate(present_count=Sum('present'), absent_count=Sum('absent'), excused_count=Sum('excused'))
+            .annotate(total=F('present_count') + F('absent_count') + F('excused_count'))
+            .order_by(*self.GROUPS[group_by])
+        )
+        results = []
+        for row in rows:
+            row['rate'] = round(row['present_count'] / row['total'], 4) if row['total'] else None
+            results.append(row)
+        return Response({'season': season.name, 'group_by': group_by, 'results': results})
+
+
+class AttendanceSyncView(views.APIView):
+    """
+    Synchronisation des présences pour les appareils hors ligne.
+    - GET ?since=<curseur> : présences modifiées depuis le curseur (par pages)
+    - POST {changes: [...], since: <curseur>} : applique un lot de modifications horodatées
+      (idempotent, dernier écrivain gagnant) puis renvoie le delta depuis le curseur
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def delta(self, cursor, limit):
+        attendances, next_cursor, has_more = AttendanceSync.changes_since(cursor, limit)
+        return {
+            'changes': SyncAttendanceSerializer(attendances, many=True).data,
+            'cursor': next_cursor,
+            'has_more': has_more,
+        }
+
+    def limit(self, request):
+        try:
+            return max(1, min(int(request.query_params.get('limit', AttendanceSync.PAGE_SIZE)), AttendanceSync.PAGE_SIZE))
+        except ValueError:
+            return AttendanceSync.PAGE_SIZE
+
+    def get(self, request):
+        try:
+            return Response(self.delta(request.query_params.get('since'), self.limit(request)))
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+    def post(self, request):
+        changes = request.data.get('changes', [])
+        if not isinstance(changes, list):
+            return Response({'error': 'changes must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = request.data.get('since')
+        try:
+            if cursor:
+                AttendanceSync.decode_cursor(cursor)
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({'status': 'success'})
+        results = AttendanceSync.apply(changes)
+        return Response({'results': results, **self.delta(cursor, self.limit(request))})
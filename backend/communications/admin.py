@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EmailTemplate, EmailLog
+from .models import EmailTemplate, EmailLog, OutboxEmail
 
 @admin.register(EmailTemplate)
 class EmailTemplateAdmin(admin.ModelAdmin):
@@ -12,3 +12,12 @@ class EmailLogAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')
     search_fields = ('recipient', 'subject')
     readonly_fields = ('recipient', 'subject', 'status', 'error_message', 'created_at')
+    # Évite un COUNT(*) sur toute la table à chaque affichage filtré
+    show_full_result_count = False
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient', 'subject', 'idempotency_key')
+    readonly_fields = ('idempotency_key', 'recipient', 'subject', 'body', 'convocation', 'attempts', 'locked_at', 'sent_at', 'last_error', 'created_at')
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from communications.models import EmailLog, OutboxEmail
+
+ARCHIVE_FIELDS = ('id', 'created_at', 'updated_at', 'recipient', 'subject', 'status', 'error_message')
+OUTBOX_ARCHIVE_FIELDS = (
+    'id', 'created_at', 'updated_at', 'idempotency_key', 'recipient', 'subject', 'body',
+    'convocation_id', 'status', 'attempts', 'sent_at', 'last_error',
+)
+# Seuls les emails dont l'envoi est terminé quittent la file
+OUTBOX_FINAL_STATUSES = ('SENT', 'DEAD')
+
+
+class Command(BaseCommand):
+    help = 'Archive les anciens logs d\'emails et emails envoyés de la file dans des fichiers NDJSON compressés (gzip) puis les supprime'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=settings.EMAIL_LOG_RETENTION_DAYS,
+            help='Âge minimal (en jours) des logs archivés',
+        )
+        parser.add_argument(
+            '--outbox-older-than',
+            type=int,
+            default=settings.EMAIL_OUTBOX_RETENTION_DAYS,
+            help='Âge minimal (en jours) des emails envoyés ou abandonnés archivés depuis la file d\'envoi',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Nombre de logs lus, écrits et supprimés par lot',
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=settings.EMAIL_LOG_ARCHIVE_DIR,
+            help='Dossier des archives',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compter les logs concernés sans rien écrire ni supprimer',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        log_cutoff = now - timedelta(days=options['older_than'])
+        outbox_cutoff = now - timedelta(days=options['outbox_older_than'])
+        self.archive(
+            EmailLog.objects.filter(created_at__lt=log_cutoff), ARCHIVE_FIELDS,
+            'email_logs', ('log', 'logs'), log_cutoff, options,
+        )
+        self.archive(
+            OutboxEmail.objects.filter(status__in=OUTBOX_FINAL_STATUSES, created_at__lt=outbox_cutoff),
+            OUTBOX_ARCHIVE_FIELDS, 'outbox_emails', ('email de la file', 'emails de la file'), outbox_cutoff, options,
+        )
+
+    def archive(self, queryset, fields, prefix, label, cutoff, options):
+        if options['dry_run']:
+            self.stdout.write(f"{queryset.count()} {label[1]} antérieurs au {cutoff:%Y-%m-%d} seraient archivés.")
+            return
+
+        os.makedirs(options['output_dir'], exist_ok=True)
+        path = os.path.join(options['output_dir'], f"{prefix}_before_{cutoff:%Y%m%d}_{timezone.now():%Y%m%d%H%M%S}.ndjson.gz")
+
+        total = 0
+        last_id = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as archive:
+            while True:
+                # Parcours par clé primaire : chaque lot reste une requête indexée, quelle que soit la profondeur
+                batch = list(queryset.filter(id__gt=last_id).order_by('id').values(*fields)[:options['batch_size']])
+                if not batch:
+                    break
+                for row in batch:
+                    archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                # Les lignes sont écrites avant d'être supprimées
+                archive.flush()
+                ids = [row['id'] for row in batch]
+                with transaction.atomic():
+                    queryset.model.objects.filter(id__in=ids).delete()
+                total += len(batch)
+                last_id = ids[-1]
+
+        if not total:
+            os.remove(path)
+            self.stdout.write(f"Aucun {label[0]} à archiver.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"{total} {label[1]} archivés dans {path}."))
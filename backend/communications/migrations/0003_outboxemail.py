@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0002_emaillog_communicati_status_e10043_idx'),
+        ('content', '0005_alter_event_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière modification')),
+                ('idempotency_key', models.CharField(max_length=64, unique=True, verbose_name="Clé d'idempotence")),
+                ('recipient', models.EmailField(max_length=254, verbose_name='Destinataire')),
+                ('subject', models.CharField(max_length=200, verbose_name='Sujet')),
+                ('body', models.TextField(verbose_name='Contenu')),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('SENDING', "En cours d'envoi"), ('SENT', 'Envoyé'), ('FAILED', 'Échec, nouvel essai prévu'), ('DEAD', 'Abandonné')], default='PENDING', max_length=20, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochaine tentative')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Pris en charge le')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Envoyé le')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('convocation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_emails', to='content.convocation', verbose_name='Convocation')),
+            ],
+            options={
+                'verbose_name': "Email en file d'envoi",
+                'verbose_name_plural': "File d'envoi des emails",
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='communicati_status_30f0af_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0003_outboxemail'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emaillog',
+            name='communicati_status_e10043_idx',
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['status', 'created_at'], name='communicati_status_f9f0cf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['created_at'], name='communicati_created_35567e_idx'),
+        ),
+    ]
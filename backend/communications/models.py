@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from core.models import TimeStampedModel
 
@@ -35,8 +36,47 @@ class EmailLog(TimeStampedModel):
         verbose_name = _("Log Email")
         verbose_name_plural = _("Logs Emails")
         ordering = ['-created_at']
+        # Liste d'administration : tri par date, filtre par statut et/ou date
+        # Les anciens logs sont archivés par la commande archive_email_logs
         indexes = [
-            models.Index(fields=['status']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.subject} ({self.status})"
+
+class OutboxEmail(TimeStampedModel):
+    """
+    Email en attente d'envoi, vidé par la tâche drain_outbox au débit configuré
+    (EMAIL_OUTBOX_RATE_PER_MINUTE), avec nouvelles tentatives espacées exponentiellement.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', _('En attente')),
+        ('SENDING', _('En cours d\'envoi')),
+        ('SENT', _('Envoyé')),
+        ('FAILED', _('Échec, nouvel essai prévu')),
+        ('DEAD', _('Abandonné')),
+    ]
+
+    idempotency_key = models.CharField(_("Clé d'idempotence"), max_length=64, unique=True)
+    recipient = models.EmailField(_("Destinataire"))
+    subject = models.CharField(_("Sujet"), max_length=200)
+    body = models.TextField(_("Contenu"))
+    convocation = models.ForeignKey('content.Convocation', on_delete=models.SET_NULL, null=True, blank=True, related_name='outbox_emails', verbose_name=_("Convocation"))
+    status = models.CharField(_("Statut"), max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(_("Tentatives"), default=0)
+    next_attempt_at = models.DateTimeField(_("Prochaine tentative"), default=timezone.now)
+    locked_at = models.DateTimeField(_("Pris en charge le"), null=True, blank=True)
+    sent_at = models.DateTimeField(_("Envoyé le"), null=True, blank=True)
+    last_error = models.TextField(_("Dernière erreur"), blank=True)
+
+    class Meta:
+        verbose_name = _("Email en file d'envoi")
+        verbose_name_plural = _("File d'envoi des emails")
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
         ]
 
     def __str__(self):
@@ -0,0 +1,153 @@
+import hashlib
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import EmailLog, OutboxEmail
+from .template_cache import get_compiled_template
+from .utils import deliver
+
+
+def mark_convocations_sent(convocation_ids):
+    """
+    Passe les convocations envoyées au statut SENT, en une seule requête par lot.
+    Seules les convocations encore en attente sont modifiées : une réponse du parent
+    (confirmée / refusée) enregistrée entre-temps n'est pas écrasée.
+    """
+    from content.models import Convocation
+
+    if not convocation_ids:
+        return 0
+    return Convocation.objects.filter(id__in=convocation_ids, status='PENDING').update(status='SENT', sent_at=timezone.now())
+
+
+def idempotency_key(*parts):
+    """
+    Clé déterministe dérivée d'une clé fournie par le client : soumettre deux fois
+    le même envoi avec la même clé ne crée qu'un email.
+    """
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def enqueue_emails(emails):
+    """
+    Ajoute des emails à la file d'envoi en une insertion, en ignorant ceux dont la clé
+    d'idempotence existe déjà. `emails` : liste de dicts (recipient, subject, body,
+    convocation_id optionnel, idempotency_key optionnelle). Sans clé fournie, l'email
+    reçoit une clé unique : renvoyer un même contenu crée un nouvel envoi.
+    Retourne le nombre d'emails nouvellement mis en file.
+    """
+    rows = []
+    for email in emails:
+        key = email.get('idempotency_key') or uuid.uuid4().hex
+        rows.append(OutboxEmail(
+            idempotency_key=key,
+            recipient=email['recipient'],
+            subject=email['subject'],
+            body=email['body'],
+            convocation_id=email.get('convocation_id'),
+        ))
+    keys = [row.idempotency_key for row in rows]
+    existing = set(OutboxEmail.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', flat=True))
+    OutboxEmail.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(set(keys) - existing)
+
+
+def enqueue_templated_emails(template_key, recipients, key_prefix=''):
+    """
+    Rend un template pour chaque {'recipient', 'context', 'convocation_id'} et le met en file.
+    Lève EmailTemplate.DoesNotExist si le template est inconnu.
+    """
+    template = get_compiled_template(template_key)
+    emails = []
+    for item in recipients:
+        subject, body = template.render(item['context'])
+        email = {'recipient': item['recipient'], 'subject': subject, 'body': body, 'convocation_id': item.get('convocation_id')}
+        if key_prefix:
+            email['idempotency_key'] = idempotency_key(key_prefix, item['recipient'], item.get('convocation_id') or '')
+        emails.append(email)
+    return enqueue_emails(emails)
+
+
+def retry_delay(attempts):
+    """
+    Délai avant la tentative suivante : base * 2^(tentatives - 1), plafonné.
+    """
+    delay = settings.EMAIL_OUTBOX_RETRY_BASE * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_RETRY_MAX))
+
+
+def claim(limit):
+    """
+    Réserve les emails dus (en attente, à réessayer, ou bloqués par un worker arrêté).
+    skip_locked permet à plusieurs workers de vider la file sans prendre les mêmes lignes.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.EMAIL_OUTBOX_LOCK_TIMEOUT)
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status__in=['PENDING', 'FAILED'], next_attempt_at__lte=now)
+                | Q(status='SENDING', locked_at__lt=stale)
+            )
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        OutboxEmail.objects.filter(id__in=ids).update(status='SENDING', locked_at=now)
+    return list(OutboxEmail.objects.filter(id__in=ids).order_by('next_attempt_at'))
+
+
+def batch_limit(limit, interval):
+    """
+    Taille de lot bornée pour que l'envoi (limit × interval) dure au plus la moitié de
+    EMAIL_OUTBOX_LOCK_TIMEOUT : sinon un autre worker reprendrait des emails en cours d'envoi.
+    """
+    return max(1, min(limit, int(settings.EMAIL_OUTBOX_LOCK_TIMEOUT / 2 / interval)))
+
+
+def drain(limit=None):
+    """
+    Envoie un lot d'emails dus, au débit EMAIL_OUTBOX_RATE_PER_MINUTE, sur une seule connexion.
+    Retourne (envoyés, en échec, reste_des_emails_dus).
+    Le débit n'est garanti que si un seul drain tourne à la fois (voir tasks.drain_outbox).
+    """
+    interval = 60 / settings.EMAIL_OUTBOX_RATE_PER_MINUTE
+    limit = batch_limit(limit or settings.EMAIL_OUTBOX_BATCH_SIZE, interval)
+    emails = claim(limit)
+    if not emails:
+        return 0, 0, False
+
+    errors = deliver(
+        [(email.recipient, email.subject, email.body) for email in emails],
+        interval=interval,
+    )
+
+    now = timezone.now()
+    logs = []
+    for email, error in zip(emails, errors):
+        email.attempts += 1
+        email.locked_at = None
+        email.updated_at = now
+        if error is None:
+            email.status = 'SENT'
+            email.sent_at = now
+            email.last_error = ''
+        else:
+            email.last_error = error
+            if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                email.status = 'DEAD'
+            else:
+                email.status = 'FAILED'
+                email.next_attempt_at = now + retry_delay(email.attempts)
+        logs.append(EmailLog(recipient=email.recipient, subject=email.subject,
+                             status='FAILED' if error else 'SENT', error_message=error or ''))
+
+    OutboxEmail.objects.bulk_update(emails, ['status', 'attempts', 'locked_at', 'sent_at', 'last_error', 'next_attempt_at', 'updated_at'])
+    EmailLog.objects.bulk_create(logs)
+    mark_convocations_sent([email.convocation_id for email in emails if email.status == 'SENT' and email.convocation_id])
+
+    sent = sum(1 for error in errors if error is None)
+    return sent, len(emails) - sent, len(emails) == limit
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import EmailTemplate
+from .template_cache import clear_template_cache
+
+
+@receiver(post_save, sender=EmailTemplate)
+@receiver(post_delete, sender=EmailTemplate)
+def invalidate_compiled_templates(sender, instance, **kwargs):
+    clear_template_cache()
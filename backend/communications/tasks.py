@@ -1,35 +1,67 @@
 from celery import shared_task
-from celery import shared_task
-from .utils import send_templated_email, send_custom_email
+from django.conf import settings
+from django.core.cache import cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Les tâches d'envoi passent par la file d'envoi (communications.outbox) : débit limité,
+# nouvelles tentatives et journalisation sont gérés par drain_outbox.
+
 @shared_task
 def send_email_task(recipient_email, template_key, context, convocation_id=None):
     """
-    Celery task to send an email asynchronously.
+    Met en file d'envoi un email basé sur un template stocké en base de données.
+    Retourne le nombre d'emails mis en file (0 si le template n'existe pas).
     """
-    logger.info(f"Starting email task for {recipient_email}")
-    success = send_templated_email(recipient_email, template_key, context)
-    
-    if convocation_id and success:
-        from content.models import Convocation
-        from django.utils import timezone
-        try:
-            convocation = Convocation.objects.get(id=convocation_id)
-            convocation.status = 'SENT'
-            convocation.sent_at = timezone.now()
-            convocation.save()
-        except Convocation.DoesNotExist:
-            logger.error(f"Convocation {convocation_id} not found during email task update.")
-    
-    return success
+    from .models import EmailTemplate
+    from .outbox import enqueue_templated_emails
+
+    logger.info(f"Queueing email for {recipient_email}")
+    try:
+        queued = enqueue_templated_emails(template_key, [
+            {'recipient': recipient_email, 'context': context, 'convocation_id': convocation_id}
+        ])
+    except EmailTemplate.DoesNotExist:
+        logger.error(f"Email template '{template_key}' not found.")
+        return 0
+    drain_outbox.delay()
+    return queued
 
 @shared_task
 def send_custom_email_task(recipient_email, subject, body):
     """
-    Celery task to send a custom email asynchronously.
+    Met en file d'envoi un email personnalisé (sans template DB).
     """
-    logger.info(f"Starting custom email task for {recipient_email}")
-    return send_custom_email(recipient_email, subject, body)
+    from .outbox import enqueue_emails
+
+    logger.info(f"Queueing custom email for {recipient_email}")
+    queued = enqueue_emails([{'recipient': recipient_email, 'subject': subject, 'body': body}])
+    drain_outbox.delay()
+    return queued
+
+# Verrou partagé (cache Redis en production) : un seul drain à la fois
+DRAIN_LOCK_KEY = 'communications:outbox:drain'
+
+@shared_task
+def drain_outbox():
+    """
+    Vide un lot de la file d'envoi (OutboxEmail) ; se replanifie tant qu'il reste des emails dus.
+    Lancée après chaque mise en file et périodiquement par Celery beat. Les lancements
+    concurrents s'arrêtent immédiatement, pour que le débit reste EMAIL_OUTBOX_RATE_PER_MINUTE
+    quel que soit le nombre de workers.
+    """
+    from .outbox import drain
+
+    # Le verrou expire avec EMAIL_OUTBOX_LOCK_TIMEOUT si le worker meurt en cours de lot
+    if not cache.add(DRAIN_LOCK_KEY, True, settings.EMAIL_OUTBOX_LOCK_TIMEOUT):
+        logger.info("Outbox drain already running, skipping")
+        return {'sent': 0, 'failed': 0, 'skipped': True}
+    try:
+        sent, failed, more = drain()
+    finally:
+        cache.delete(DRAIN_LOCK_KEY)
+
+    if more:
+        drain_outbox.delay()
+    return {'sent': sent, 'failed': failed}
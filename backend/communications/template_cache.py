@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.template import Context, Template
+from .models import EmailTemplate
+
+
+class CompiledTemplate:
+    """
+    Sujet et corps d'un EmailTemplate compilés une seule fois.
+    """
+
+    def __init__(self, template):
+        self.key = template.key
+        self.updated_at = template.updated_at
+        self.subject = Template(template.subject)
+        self.body = Template(template.body)
+
+    def render(self, context):
+        ctx = Context(context)
+        return self.subject.render(ctx), self.body.render(ctx)
+
+
+class TemplateCache:
+    """
+    Cache local au processus (LRU) des templates compilés, indexé par (clé, updated_at).
+
+    La ligne EmailTemplate elle-même est gardée EMAIL_TEMPLATE_CACHE_TTL secondes :
+    un worker ne relit la base qu'une fois par période, et une modification faite
+    depuis un autre processus est prise en compte au plus tard à l'expiration.
+    Dans le processus qui enregistre le template, le signal post_save vide le cache
+    immédiatement (voir communications/signals.py).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.compiled = OrderedDict()  # (clé, updated_at) -> CompiledTemplate
+        self.versions = {}  # clé -> (updated_at, expiration)
+
+    def get(self, key):
+        """
+        Retourne le template compilé de la clé, ou lève EmailTemplate.DoesNotExist.
+        """
+        now = time.monotonic()
+        with self.lock:
+            version = self.versions.get(key)
+            if version and version[1] > now and (key, version[0]) in self.compiled:
+                self.compiled.move_to_end((key, version[0]))
+                return self.compiled[(key, version[0])]
+
+        template = EmailTemplate.objects.only('key', 'subject', 'body', 'updated_at').get(key=key)
+        cache_key = (key, template.updated_at)
+        with self.lock:
+            compiled = self.compiled.get(cache_key)
+            if compiled is None:
+                compiled = CompiledTemplate(template)
+                self.compiled[cache_key] = compiled
+            self.compiled.move_to_end(cache_key)
+            while len(self.compiled) > settings.EMAIL_TEMPLATE_CACHE_SIZE:
+                self.compiled.popitem(last=False)
+            self.versions[key] = (template.updated_at, now + settings.EMAIL_TEMPLATE_CACHE_TTL)
+        return compiled
+
+    def clear(self):
+        with self.lock:
+            self.compiled.clear()
+            self.versions.clear()
+
+
+template_cache = TemplateCache()
+
+
+def get_compiled_template(key):
+    return template_cache.get(key)
+
+
+def clear_template_cache():
+    template_cache.clear()
@@ -1,3 +1,302 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from content.models import Convocation, Event
+from core.models import Member
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Template
+from .models import EmailLog, EmailTemplate, OutboxEmail
+from .outbox import drain, enqueue_emails
+from .tasks import DRAIN_LOCK_KEY, drain_outbox, send_custom_email_task, send_email_task
+from .template_cache import clear_template_cache, get_compiled_template
 
-# Create your tests here.
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SendConvocationTest(TestCase):
+    def setUp(self):
+        clear_template_cache()
+        start = timezone.now() + timedelta(days=7)
+        self.event = Event.objects.create(title='Tournoi', description='Desc', start_time=start,
+                                          end_time=start + timedelta(hours=2), location='Dojo')
+        self.members = []
+        for i in range(25):
+            parent = User.objects.create(username=f'parent{i}', email=f'parent{i}@test.com')
+            self.members.append(Member.objects.create(first_name=f'Kid{i}', last_name='Test',
+                                                      birth_date='2012-01-01', parent=parent))
+        # Ni parent ni email : pas de destinataire
+        self.members.append(Member.objects.create(first_name='NoMail', last_name='Test', birth_date='2012-01-01'))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+
+    def send(self, **extra):
+        payload = {'event_id': self.event.id, 'member_ids': [m.id for m in self.members] + [999999], **extra}
+        with mock.patch('communications.views.drain_outbox') as drain_outbox, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/convocations/send/', payload, format='json')
+        drain_outbox.delay.assert_called_once()
+        return response
+
+    def test_bulk_dispatch_in_constant_queries(self):
+        Convocation.objects.create(event=self.event, member=self.members[0], status='SENT')
+
+        # événement + template (test, création, lecture) + adhérents + convocations (insertion, relecture)
+        # + file d'envoi (clés existantes, insertion)
+        with self.assertNumQueries(9):
+            response = self.send()
+
+        self.assertEqual(response.data['queued_count'], 25)
+        self.assertEqual(response.data['failed_count'], 2)
+        self.assertEqual(Convocation.objects.filter(event=self.event).count(), 26)
+        # La convocation existante n'est pas réinitialisée
+        self.assertEqual(Convocation.objects.get(member=self.members[0]).status, 'SENT')
+
+        email = OutboxEmail.objects.get(recipient='parent0@test.com')
+        self.assertEqual(email.subject, 'Convocation : Tournoi')
+        self.assertIn('Kid0 Test', email.body)
+        self.assertEqual(email.convocation, Convocation.objects.get(member=self.members[0]))
+        self.assertEqual(OutboxEmail.objects.filter(status='PENDING').count(), 25)
+
+    def test_resubmission_with_same_key_is_deduplicated(self):
+        self.send(idempotency_key='tournoi-1')
+        response = self.send(idempotency_key='tournoi-1')
+
+        self.assertEqual((response.data['queued_count'], response.data['duplicate_count']), (0, 25))
+        self.assertEqual(OutboxEmail.objects.count(), 25)
+
+    def test_resend_without_key_is_queued_again(self):
+        self.send()
+        response = self.send()
+
+        self.assertEqual((response.data['queued_count'], response.data['duplicate_count']), (25, 0))
+        self.assertEqual(OutboxEmail.objects.count(), 50)
+
+    def test_bulk_email(self):
+        payload = {'member_ids': [m.id for m in self.members], 'subject': 'Info', 'body': 'Ligne 1\nLigne 2',
+                   'idempotency_key': 'newsletter-1'}
+        with mock.patch('communications.views.drain_outbox'):
+            response = self.client.post('/api/emails/bulk-send/', payload, format='json')
+            duplicate = self.client.post('/api/emails/bulk-send/', payload, format='json')
+
+        self.assertEqual((response.data['queued_count'], response.data['failed_count']), (25, 1))
+        self.assertEqual((duplicate.data['queued_count'], duplicate.data['duplicate_count']), (0, 25))
+        self.assertEqual(OutboxEmail.objects.count(), 25)
+        self.assertEqual(OutboxEmail.objects.get(recipient='parent0@test.com').body, 'Ligne 1<br>Ligne 2')
+
+
+@override_settings(EMAIL_OUTBOX_RATE_PER_MINUTE=60000, EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+                   EMAIL_OUTBOX_RETRY_BASE=60, EMAIL_OUTBOX_BATCH_SIZE=10)
+class OutboxTest(TestCase):
+    def setUp(self):
+        start = timezone.now() + timedelta(days=7)
+        event = Event.objects.create(title='Tournoi', description='Desc', start_time=start, end_time=start + timedelta(hours=2))
+        self.convocation = Convocation.objects.create(event=event, member=Member.objects.create(
+            first_name='Kid', last_name='Test', birth_date='2012-01-01'))
+        enqueue_emails([
+            {'recipient': f'parent{i}@test.com', 'subject': 'Info', 'body': f'Corps {i}'} for i in range(3)
+        ] + [{'recipient': 'kid@test.com', 'subject': 'Convocation', 'body': 'Corps', 'convocation_id': self.convocation.id}])
+
+    def test_drain_sends_and_marks_convocation(self):
+        self.assertEqual(drain(), (4, 0, False))
+
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(OutboxEmail.objects.filter(status='SENT', attempts=1).count(), 4)
+        self.assertEqual(EmailLog.objects.filter(status='SENT').count(), 4)
+        self.convocation.refresh_from_db()
+        self.assertEqual(self.convocation.status, 'SENT')
+        # Rien de plus à envoyer
+        self.assertEqual(drain(), (0, 0, False))
+
+    def test_batch_size_and_rate(self):
+        with mock.patch('communications.utils.time.sleep') as sleep:
+            self.assertEqual(drain(limit=3), (3, 0, True))
+        self.assertEqual(sleep.call_count, 2)
+        sleep.assert_called_with(0.001)
+
+    def test_retries_with_backoff_then_dead_letter(self):
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('throttled')), \
+                self.assertLogs('communications.utils', level='ERROR'):
+            self.assertEqual(drain(), (0, 4, False))
+            email = OutboxEmail.objects.get(recipient='parent0@test.com')
+            self.assertEqual((email.status, email.attempts, email.last_error), ('FAILED', 1, 'throttled'))
+            self.assertAlmostEqual((email.next_attempt_at - timezone.now()).total_seconds(), 60, delta=5)
+            # Pas encore dû
+            self.assertEqual(drain(), (0, 0, False))
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            drain()
+            email.refresh_from_db()
+            self.assertAlmostEqual((email.next_attempt_at - timezone.now()).total_seconds(), 120, delta=5)
+
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            drain()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('DEAD', 3))
+        self.assertEqual(drain(), (0, 0, False))
+
+    @override_settings(EMAIL_OUTBOX_RATE_PER_MINUTE=60, EMAIL_OUTBOX_LOCK_TIMEOUT=4)
+    def test_batch_is_bounded_by_lock_timeout(self):
+        # 1 email/s et reprise après 4 s : au plus 2 emails par lot
+        with mock.patch('communications.utils.time.sleep'):
+            self.assertEqual(drain(limit=10), (2, 0, True))
+
+    def test_single_drain_at_a_time(self):
+        cache.add(DRAIN_LOCK_KEY, True)
+        self.addCleanup(cache.delete, DRAIN_LOCK_KEY)
+        with mock.patch('communications.tasks.drain_outbox.delay') as delay:
+            self.assertTrue(drain_outbox()['skipped'])
+            cache.delete(DRAIN_LOCK_KEY)
+            self.assertEqual(drain_outbox(), {'sent': 4, 'failed': 0})
+        delay.assert_not_called()
+        self.assertTrue(cache.add(DRAIN_LOCK_KEY, True))
+
+    def test_stale_sending_rows_are_reclaimed(self):
+        OutboxEmail.objects.update(status='SENDING', locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(drain()[0], 4)
+
+
+class EmailTaskTest(TestCase):
+    def setUp(self):
+        clear_template_cache()
+        EmailTemplate.objects.create(key='CONVOCATION', subject='Convocation : {{ event_title }}',
+                                     body='<p>Bonjour {{ parent_name }}</p>')
+        start = timezone.now() + timedelta(days=7)
+        event = Event.objects.create(title='Tournoi', description='Desc', start_time=start, end_time=start + timedelta(hours=2))
+        self.convocations = [
+            Convocation.objects.create(event=event, member=Member.objects.create(
+                first_name=f'Kid{i}', last_name='Test', birth_date='2012-01-01'))
+            for i in range(3)
+        ]
+        delay = mock.patch('communications.tasks.drain_outbox.delay')
+        self.drain_delay = delay.start()
+        self.addCleanup(delay.stop)
+
+    def test_task_enqueues_to_outbox(self):
+        for i, convocation in enumerate(self.convocations):
+            context = {'event_title': 'Tournoi', 'parent_name': f'P{i}'}
+            self.assertEqual(send_email_task(f'parent{i}@test.com', 'CONVOCATION', context, convocation.id), 1)
+        self.assertEqual(self.drain_delay.call_count, 3)
+        self.assertEqual(len(mail.outbox), 0)
+
+        email = OutboxEmail.objects.get(recipient='parent1@test.com')
+        self.assertEqual((email.subject, email.body), ('Convocation : Tournoi', '<p>Bonjour P1</p>'))
+        self.assertEqual(email.convocation, self.convocations[1])
+
+        drain()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(Convocation.objects.filter(status='SENT').count(), 3)
+
+    def test_custom_and_unknown_template(self):
+        self.assertEqual(send_custom_email_task('a@test.com', 'Info', 'Corps'), 1)
+        self.assertEqual(OutboxEmail.objects.get().subject, 'Info')
+
+        with self.assertLogs('communications.tasks', level='ERROR'):
+            self.assertEqual(send_email_task('b@test.com', 'UNKNOWN', {}), 0)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+    def test_connection_failure_logs_every_recipient(self):
+        send_custom_email_task('a@test.com', 'Info', 'Corps')
+        send_custom_email_task('b@test.com', 'Info', 'Corps')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open', side_effect=OSError('SMTP down')), \
+                self.assertLogs('communications.utils', level='ERROR'):
+            self.assertEqual(drain(), (0, 2, False))
+
+        self.assertEqual(list(EmailLog.objects.values_list('status', 'error_message')), [('FAILED', 'SMTP down')] * 2)
+
+
+class TemplateCacheTest(TestCase):
+    def setUp(self):
+        clear_template_cache()
+        self.template = EmailTemplate.objects.create(key='WELCOME', subject='Bienvenue {{ name }}', body='<p>{{ name }}</p>')
+
+    def test_one_lookup_and_one_compile_per_process(self):
+        with mock.patch('communications.template_cache.Template', wraps=Template) as compile_template:
+            with self.assertNumQueries(1):
+                for i in range(5):
+                    subject, body = get_compiled_template('WELCOME').render({'name': f'Kid{i}'})
+
+        self.assertEqual((subject, body), ('Bienvenue Kid4', '<p>Kid4</p>'))
+        # sujet + corps, une seule fois
+        self.assertEqual(compile_template.call_count, 2)
+
+    def test_save_invalidates(self):
+        get_compiled_template('WELCOME')
+        self.template.subject = 'Salut {{ name }}'
+        self.template.save()
+
+        self.assertEqual(get_compiled_template('WELCOME').render({'name': 'Kid'})[0], 'Salut Kid')
+
+    @override_settings(EMAIL_TEMPLATE_CACHE_TTL=0)
+    def test_expired_lookup_reuses_compiled_template(self):
+        get_compiled_template('WELCOME')
+        with mock.patch('communications.template_cache.Template') as compile_template:
+            with self.assertNumQueries(1):
+                get_compiled_template('WELCOME')
+        compile_template.assert_not_called()
+
+    def test_missing_template(self):
+        with self.assertRaises(EmailTemplate.DoesNotExist):
+            get_compiled_template('UNKNOWN')
+
+
+class ArchiveEmailLogsTest(TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        EmailLog.objects.bulk_create([
+            EmailLog(recipient=f'parent{i}@test.com', subject='Info', status='SENT' if i % 2 else 'FAILED')
+            for i in range(7)
+        ])
+        old = list(EmailLog.objects.order_by('id').values_list('id', flat=True)[:5])
+        EmailLog.objects.filter(id__in=old).update(created_at=timezone.now() - timedelta(days=400))
+
+    def archive(self, *args):
+        out = io.StringIO()
+        call_command('archive_email_logs', '--output-dir', self.output_dir, *args, stdout=out)
+        return out.getvalue()
+
+    def test_archives_old_logs_in_batches(self):
+        self.archive('--older-than', '365', '--batch-size', '2')
+
+        self.assertEqual(EmailLog.objects.count(), 2)
+        (filename,) = os.listdir(self.output_dir)
+        with gzip.open(os.path.join(self.output_dir, filename), 'rt') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['recipient'], 'parent0@test.com')
+        self.assertEqual(rows[0]['status'], 'FAILED')
+
+    def test_dry_run_and_nothing_to_archive(self):
+        self.assertIn('5 logs', self.archive('--dry-run'))
+        self.assertEqual(EmailLog.objects.count(), 7)
+
+        self.assertIn('Aucun log', self.archive('--older-than', '1000'))
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_archives_finished_outbox_emails(self):
+        enqueue_emails([{'recipient': f'parent{i}@test.com', 'subject': 'Info', 'body': '<p>Corps</p>'} for i in range(4)])
+        emails = list(OutboxEmail.objects.order_by('id'))
+        OutboxEmail.objects.filter(id__in=[e.id for e in emails[:3]]).update(created_at=timezone.now() - timedelta(days=60))
+        OutboxEmail.objects.filter(id=emails[0].id).update(status='SENT')
+        OutboxEmail.objects.filter(id=emails[1].id).update(status='DEAD')
+
+        self.archive('--older-than', '1000', '--outbox-older-than', '30')
+
+        # L'email encore en attente et l'email récent restent dans la file
+        self.assertEqual(sorted(OutboxEmail.objects.values_list('id', flat=True)), [emails[2].id, emails[3].id])
+        (filename,) = os.listdir(self.output_dir)
+        self.assertTrue(filename.startswith('outbox_emails_'))
+        with gzip.open(os.path.join(self.output_dir, filename), 'rt') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row['status'] for row in rows], ['SENT', 'DEAD'])
+        self.assertEqual(rows[0]['body'], '<p>Corps</p>')
@@ -1,85 +1,42 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
-from django.template import Template, Context
-from .models import EmailTemplate, EmailLog
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-def send_templated_email(recipient_email, template_key, context):
+def build_message(recipient_email, subject, body, connection=None):
     """
-    Envoie un email basé sur un template stocké en base de données.
-    Log l'envoi dans EmailLog.
+    Construit le message (texte + alternative HTML), comme send_mail(html_message=...).
     """
-    try:
-        template = EmailTemplate.objects.get(key=template_key)
-    except EmailTemplate.DoesNotExist:
-        logger.error(f"Email template '{template_key}' not found.")
-        return False
-
-    # Render subject and body
-    subject_template = Template(template.subject)
-    body_template = Template(template.body)
-    ctx = Context(context)
-
-    subject = subject_template.render(ctx)
-    body = body_template.render(ctx)
-
-    status = 'FAILED'
-    error_message = ''
-
-    try:
-        send_mail(
-            subject,
-            body,
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient_email],
-            fail_silently=False,
-            html_message=body 
-        )
-        status = 'SENT'
-    except Exception as e:
-        error_message = str(e)
-        logger.error(f"Failed to send email to {recipient_email}: {e}")
-
-    # Log the attempt
-    EmailLog.objects.create(
-        recipient=recipient_email,
-        subject=subject,
-        status=status,
-        error_message=error_message
-    )
-
-    return status == 'SENT'
+    message = EmailMultiAlternatives(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient_email], connection=connection)
+    message.attach_alternative(body, 'text/html')
+    return message
 
-def send_custom_email(recipient_email, subject, body):
+def deliver(messages, interval=0):
     """
-    Envoie un email personnalisé (sans template DB).
-    Log l'envoi dans EmailLog.
+    Envoie une liste de (destinataire, sujet, corps) sur une seule connexion SMTP,
+    en espaçant les envois de `interval` secondes (limitation de débit).
+    Retourne, dans l'ordre, None pour chaque message envoyé ou le message d'erreur.
     """
-    status = 'FAILED'
-    error_message = ''
-
+    connection = get_connection(fail_silently=False)
     try:
-        send_mail(
-            subject,
-            body,
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient_email],
-            fail_silently=False,
-            html_message=body 
-        )
-        status = 'SENT'
+        connection.open()
     except Exception as e:
-        error_message = str(e)
-        logger.error(f"Failed to send custom email to {recipient_email}: {e}")
-
-    # Log the attempt
-    EmailLog.objects.create(
-        recipient=recipient_email,
-        subject=subject,
-        status=status,
-        error_message=error_message
-    )
+        logger.error(f"Failed to open email connection: {e}")
+        return [str(e)] * len(messages)
 
-    return status == 'SENT'
+    errors = []
+    try:
+        for index, (recipient_email, subject, body) in enumerate(messages):
+            if index and interval:
+                time.sleep(interval)
+            try:
+                connection.send_messages([build_message(recipient_email, subject, body, connection)])
+                errors.append(None)
+            except Exception as e:
+                errors.append(str(e))
+                logger.error(f"Failed to send email to {recipient_email}: {e}")
+    finally:
+        connection.close()
+    return errors
@@ -1,12 +1,34 @@
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import views, status
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from content.models import Event, Convocation
 from core.models import Member
-from .tasks import send_email_task, send_custom_email_task
+from .outbox import enqueue_emails, enqueue_templated_emails, idempotency_key
+from .tasks import drain_outbox
 from .models import EmailTemplate
 
+def get_recipient(member):
+    """
+    Adresse et nom du destinataire : l'email du parent en priorité, sinon celui de l'adhérent.
+    Le parent doit avoir été chargé avec select_related('parent').
+    """
+    if member.parent and member.parent.email:
+        return member.parent.email, member.parent.username # Or get full name
+    if member.email:
+        return member.email, "Parent"
+    return None, "Parent"
+
+def queue_emails(enqueue, *args, **kwargs):
+    """
+    Met les emails en file d'envoi (communications.outbox) puis réveille le worker
+    chargé de la vider, une fois la transaction validée.
+    """
+    queued = enqueue(*args, **kwargs)
+    transaction.on_commit(lambda: drain_outbox.delay())
+    return queued
+
 class SendConvocationView(views.APIView):
     """
     Vue pour envoyer des convocations par email.
@@ -29,59 +51,45 @@ class SendConvocationView(views.APIView):
                 body="<p>Bonjour {{ parent_name }},</p><p>Votre enfant {{ child_name }} est convoqué à l'événement <strong>{{ event_title }}</strong>.</p><p>Date : {{ event_date }}</p><p>Lieu : {{ event_location }}</p><p>Merci de confirmer sa présence.</p>"
             )
 
-        success_count = 0
-        failed_count = 0
-
-        for member_id in member_ids:
-            try:
-                member = Member.objects.get(id=member_id)
-                
-                # Create or update Convocation
-                convocation, created = Convocation.objects.get_or_create(
-                    event=event,
-                    member=member
-                )
-
-                # Send Email (if parent has email, or member has email)
-                # Logic: Try parent email first, then member email (if any, though we removed unique constraint, some might have it)
-                # Actually, our logic allows member.email to be empty.
-                # We should check parent.email.
-                
-                recipient_email = None
-                parent_name = "Parent"
-                
-                if member.parent and member.parent.email:
-                    recipient_email = member.parent.email
-                    parent_name = member.parent.username # Or get full name
-                elif member.email:
-                    recipient_email = member.email
-                
-                if recipient_email:
-                    context = {
-                        'parent_name': parent_name,
-                        'child_name': f"{member.first_name} {member.last_name}",
-                        'event_title': event.title,
-                        'event_date': event.start_time.strftime('%d/%m/%Y %H:%M'),
-                        'event_location': event.location
-                    }
-                    
-                    # Send Email asynchronously
-                    send_email_task.delay(
-                        recipient_email, 
-                        template_key, 
-                        context, 
-                        convocation_id=convocation.id
-                    )
-                    success_count += 1 # We assume success for the API response, actual status updated by worker
-                else:
-                    failed_count += 1 # No email found
-
-            except Member.DoesNotExist:
-                failed_count += 1
-        
+        members = list(Member.objects.filter(id__in=member_ids).select_related('parent'))
+        failed_count = len(set(member_ids)) - len(members)
+
+        # Une seule insertion ; les convocations déjà existantes sont conservées telles quelles
+        Convocation.objects.bulk_create(
+            [Convocation(event=event, member=member) for member in members],
+            ignore_conflicts=True,
+        )
+        convocation_ids = dict(
+            Convocation.objects.filter(event=event, member__in=members).values_list('member_id', 'id')
+        )
+
+        event_date = event.start_time.strftime('%d/%m/%Y %H:%M')
+        recipients = []
+        for member in members:
+            # Send Email (if parent has email, or member has email)
+            recipient_email, parent_name = get_recipient(member)
+            if not recipient_email:
+                failed_count += 1 # No email found
+                continue
+
+            context = {
+                'parent_name': parent_name,
+                'child_name': f"{member.first_name} {member.last_name}",
+                'event_title': event.title,
+                'event_date': event_date,
+                'event_location': event.location
+            }
+            recipients.append({'recipient': recipient_email, 'context': context, 'convocation_id': convocation_ids[member.id]})
+
+        # Send Email asynchronously through the outbox (rate limited, retried)
+        new_count = queue_emails(enqueue_templated_emails, template_key, recipients,
+                                 key_prefix=request.data.get('idempotency_key', ''))
+        # Les doublons (même idempotency_key) ne sont pas comptés comme mis en file ;
+        # le statut réel est mis à jour par le worker
         return Response({
-            'message': f"{success_count} emails queued for sending.",
-            'queued_count': success_count,
+            'message': f"{new_count} emails queued for sending.",
+            'queued_count': new_count,
+            'duplicate_count': len(recipients) - new_count,
             'failed_count': failed_count
         })
 
@@ -97,34 +105,31 @@ class BulkEmailView(views.APIView):
         if not member_ids or not subject or not body:
             return Response({'error': 'Member IDs, subject and body are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        success_count = 0
-        failed_count = 0
-
         # Replace newlines with <br> for HTML email if it's plain text
         if '<br>' not in body and '<p>' not in body:
             body = body.replace('\n', '<br>')
 
-        for member_id in member_ids:
-            try:
-                member = Member.objects.get(id=member_id)
-                
-                recipient_email = None
-                
-                if member.parent and member.parent.email:
-                    recipient_email = member.parent.email
-                elif member.email:
-                    recipient_email = member.email
-                
-                if recipient_email:
-                    send_custom_email_task.delay(recipient_email, subject, body)
-                    success_count += 1
-                else:
-                    failed_count += 1
-            except Member.DoesNotExist:
+        members = list(Member.objects.filter(id__in=member_ids).select_related('parent'))
+        failed_count = len(set(member_ids)) - len(members)
+
+        emails = []
+        key_prefix = request.data.get('idempotency_key')
+        for member in members:
+            recipient_email, _ = get_recipient(member)
+            if not recipient_email:
                 failed_count += 1
-        
+                continue
+            email = {'recipient': recipient_email, 'subject': subject, 'body': body}
+            if key_prefix:
+                # Un nouvel essai avec un contenu corrigé n'est pas un doublon
+                email['idempotency_key'] = idempotency_key(key_prefix, recipient_email, subject, body)
+            emails.append(email)
+
+        new_count = queue_emails(enqueue_emails, emails)
+
         return Response({
-            'message': f"{success_count} emails queued.",
-            'queued_count': success_count,
+            'message': f"{new_count} emails queued.",
+            'queued_count': new_count,
+            'duplicate_count': len(emails) - new_count,
             'failed_count': failed_count
         })
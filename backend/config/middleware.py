@@ -0,0 +1,173 @@
+import contextvars
+import heapq
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger('config.profiling')
+
+# Profil de la requête en cours (None hors échantillonnage)
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """
+    Mesures collectées pendant le traitement d'une requête.
+    """
+
+    def __init__(self, slow_query_count):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.slow_queries = []
+        self.slow_query_count = slow_query_count
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def record_query(self, sql, duration):
+        self.query_count += 1
+        self.sql_time += duration
+        entry = (duration, self.query_count, sql)
+        if len(self.slow_queries) < self.slow_query_count:
+            heapq.heappush(self.slow_queries, entry)
+        elif self.slow_query_count:
+            heapq.heappushpop(self.slow_queries, entry)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record_query(sql, time.perf_counter() - started)
+
+
+@contextmanager
+def profile_serializer():
+    """
+    Comptabilise le temps de sérialisation dans le profil courant.
+    Les sérialiseurs imbriqués ne sont comptés qu'une fois.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    profile.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serializer_depth -= 1
+        if not profile.serializer_depth:
+            profile.serializer_time += time.perf_counter() - started
+
+
+def _instrument_serializer_data(serializer_class):
+    data = serializer_class.data
+
+    def profiled_data(self):
+        with profile_serializer():
+            return data.fget(self)
+
+    profiled_data.__wrapped__ = data.fget
+    serializer_class.data = property(profiled_data)
+
+
+_serializers_instrumented = False
+
+
+def instrument_serializers():
+    """
+    Chronomètre l'accès à `.data` des sérialiseurs DRF (installé une seule fois, et
+    seulement si le profilage est activé : hors requête profilée, le coût se limite à la
+    lecture du profil courant).
+    """
+    global _serializers_instrumented
+    if _serializers_instrumented:
+        return
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        _instrument_serializer_data(serializer_class)
+    _serializers_instrumented = True
+
+
+class RequestProfilingMiddleware:
+    """
+    Instrumentation optionnelle des requêtes : nombre de requêtes SQL, temps SQL,
+    requêtes les plus lentes, temps de sérialisation et taille de la réponse.
+
+    Les mesures sont renvoyées dans l'en-tête `Server-Timing` et journalisées
+    (logger `config.profiling`) sous forme d'une ligne JSON. Activée par
+    REQUEST_PROFILING_ENABLED, échantillonnée selon REQUEST_PROFILING_SAMPLE_RATE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile():
+            return self.get_response(request)
+        # Instrumentation de DRF installée seulement au premier échantillon (profilage activé)
+        instrument_serializers()
+
+        profile = RequestProfile(getattr(settings, 'REQUEST_PROFILING_SLOW_QUERIES', 3))
+        token = _current_profile.set(profile)
+        try:
+            with self.wrap_connections(profile):
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+
+        total = time.perf_counter() - profile.started
+        size = None if response.streaming else len(response.content)
+        response['Server-Timing'] = self.server_timing(profile, total)
+        self.log(request, response, profile, total, size)
+        return response
+
+    def should_profile(self):
+        if not getattr(settings, 'REQUEST_PROFILING_ENABLED', False):
+            return False
+        return random.random() < getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 1.0)
+
+    @contextmanager
+    def wrap_connections(self, profile):
+        wrappers = [connection.execute_wrapper(profile) for connection in connections.all()]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        try:
+            yield
+        finally:
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+
+    @staticmethod
+    def server_timing(profile, total):
+        return ', '.join([
+            f'db;dur={profile.sql_time * 1000:.1f};desc="{profile.query_count} queries"',
+            f'serialize;dur={profile.serializer_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+    @staticmethod
+    def log(request, response, profile, total, size):
+        # Les requêtes SQL ne figurent que dans les logs, jamais dans les en-têtes
+        slow_queries = sorted(profile.slow_queries, reverse=True)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'query_count': profile.query_count,
+            'sql_ms': round(profile.sql_time * 1000, 1),
+            'serializer_ms': round(profile.serializer_time * 1000, 1),
+            'response_bytes': size,
+            'slow_queries': [
+                {'ms': round(duration * 1000, 1), 'sql': sql[:500]}
+                for duration, _, sql in slow_queries
+            ],
+        }
+        logger.info(json.dumps(record), extra={'profile': record})
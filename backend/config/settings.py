@@ -75,6 +75,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'config.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -141,6 +142,40 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis en production (CACHE_URL=redis://redis:6379/1), mémoire locale par défaut (tests, dev)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+STATISTICS_CACHE_TIMEOUT = env.int('STATISTICS_CACHE_TIMEOUT', default=60 * 15)
+ROSTER_CACHE_TIMEOUT = env.int('ROSTER_CACHE_TIMEOUT', default=60 * 15)
+# Délai (secondes) pendant lequel les présences récentes sont relues à chaque synchronisation
+ATTENDANCE_SYNC_SAFETY_WINDOW = env.int('ATTENDANCE_SYNC_SAFETY_WINDOW', default=60)
+
+
+# Request profiling (config.middleware.RequestProfilingMiddleware)
+REQUEST_PROFILING_ENABLED = env.bool('REQUEST_PROFILING_ENABLED', default=False)
+REQUEST_PROFILING_SAMPLE_RATE = env.float('REQUEST_PROFILING_SAMPLE_RATE', default=1.0)
+REQUEST_PROFILING_SLOW_QUERIES = env.int('REQUEST_PROFILING_SLOW_QUERIES', default=3)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'config.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -192,3 +227,25 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# File d'envoi des emails (communications.outbox)
+EMAIL_OUTBOX_RATE_PER_MINUTE = env.int('EMAIL_OUTBOX_RATE_PER_MINUTE', default=120)
+EMAIL_OUTBOX_BATCH_SIZE = env.int('EMAIL_OUTBOX_BATCH_SIZE', default=100)
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5)
+EMAIL_OUTBOX_RETRY_BASE = env.int('EMAIL_OUTBOX_RETRY_BASE', default=60)
+EMAIL_OUTBOX_RETRY_MAX = env.int('EMAIL_OUTBOX_RETRY_MAX', default=60 * 60)
+# Un email resté « en cours d'envoi » plus longtemps (worker arrêté) est repris
+EMAIL_OUTBOX_LOCK_TIMEOUT = env.int('EMAIL_OUTBOX_LOCK_TIMEOUT', default=10 * 60)
+# Archivage des EmailLog (commande archive_email_logs) : hors MEDIA_ROOT, les logs contiennent des adresses
+EMAIL_LOG_RETENTION_DAYS = env.int('EMAIL_LOG_RETENTION_DAYS', default=365)
+# Les emails envoyés ou abandonnés de la file (corps HTML complet) sont archivés plus tôt
+EMAIL_OUTBOX_RETENTION_DAYS = env.int('EMAIL_OUTBOX_RETENTION_DAYS', default=30)
+EMAIL_LOG_ARCHIVE_DIR = env('EMAIL_LOG_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archives', 'email_logs'))
+CELERY_BEAT_SCHEDULE = {
+    'drain-email-outbox': {
+        'task': 'communications.tasks.drain_outbox',
+        'schedule': env.int('EMAIL_OUTBOX_DRAIN_INTERVAL', default=60),
+    },
+}
+# Cache local des templates d'emails compilés (communications.template_cache)
+EMAIL_TEMPLATE_CACHE_SIZE = env.int('EMAIL_TEMPLATE_CACHE_SIZE', default=64)
+EMAIL_TEMPLATE_CACHE_TTL = env.int('EMAIL_TEMPLATE_CACHE_TTL', default=300)
@@ -25,10 +25,10 @@ from django.conf.urls.static import static
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
-from core.views import SeasonViewSet, CategoryViewSet, RegistrationViewSet, MemberViewSet, InvoiceViewSet, StatisticsView, UserRegistrationView, FamilyViewSet, HealthCheckView, CustomTokenObtainPairView, UserViewSet, PaymentOptionViewSet
+from core.views import SeasonViewSet, CategoryViewSet, RegistrationViewSet, MemberViewSet, InvoiceViewSet, StatisticsView, StatisticsCacheView, UserRegistrationView, FamilyViewSet, HealthCheckView, CustomTokenObtainPairView, UserViewSet, PaymentOptionViewSet, ExportJobViewSet
 from content.views import EventViewSet, GalleryImageViewSet
 from communications.views import SendConvocationView, BulkEmailView
-from attendance.views import CourseViewSet, SessionViewSet
+from attendance.views import AttendanceStatisticsView, AttendanceSyncView, CourseViewSet, HolidayViewSet, SessionViewSet
 
 router = DefaultRouter()
 router.register(r'members', MemberViewSet)
@@ -41,8 +41,10 @@ router.register(r'registrations', RegistrationViewSet)
 router.register(r'my-family', FamilyViewSet, basename='my-family')
 router.register(r'courses', CourseViewSet)
 router.register(r'sessions', SessionViewSet)
+router.register(r'holidays', HolidayViewSet)
 router.register(r'users', UserViewSet)
 router.register(r'payment-options', PaymentOptionViewSet)
+router.register(r'export-jobs', ExportJobViewSet)
 
 # Restrict admin to superusers
 admin.site.has_permission = lambda r: r.user.is_active and r.user.is_superuser
@@ -52,6 +54,9 @@ urlpatterns = [
     path('api/', include(router.urls)),
     path('health/', HealthCheckView.as_view(), name='health_check'),
     path('api/statistics/', StatisticsView.as_view(), name='statistics'),
+    path('api/statistics/cache/', StatisticsCacheView.as_view(), name='statistics_cache'),
+    path('api/attendance/statistics/', AttendanceStatisticsView.as_view(), name='attendance_statistics'),
+    path('api/attendance/sync/', AttendanceSyncView.as_view(), name='attendance_sync'),
     path('api/register/', UserRegistrationView.as_view(), name='register'),
     path('api/convocations/send/', SendConvocationView.as_view(), name='send_convocation'),
     path('api/emails/bulk-send/', BulkEmailView.as_view(), name='bulk_send_email'),
@@ -18,3 +18,56 @@ class EventConstraintTests(TestCase):
         event = Event(title="Bad Event", description="Desc", start_time=start, end_time=end)
         with self.assertRaises(ValidationError):
             event.full_clean()
+
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APIClient
+from communications.outbox import enqueue_emails, mark_convocations_sent
+from core.models import Member
+from .models import Convocation
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConvocationDeliveryTest(TestCase):
+    def setUp(self):
+        start = timezone.now() + timedelta(days=7)
+        self.event = Event.objects.create(title='Tournoi', description='Desc', start_time=start, end_time=start + timedelta(hours=2))
+        self.convocations = [
+            Convocation.objects.create(event=self.event, member=Member.objects.create(
+                first_name=f'Kid{i}', last_name='Test', birth_date='2012-01-01'))
+            for i in range(4)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pass'))
+
+    def test_mark_sent_keeps_parent_answers(self):
+        self.convocations[0].status = 'CONFIRMED'
+        self.convocations[0].save()
+
+        with self.assertNumQueries(1):
+            updated = mark_convocations_sent([c.id for c in self.convocations])
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(
+            list(Convocation.objects.order_by('id').values_list('status', flat=True)),
+            ['CONFIRMED', 'SENT', 'SENT', 'SENT'],
+        )
+
+    def test_delivery_progress(self):
+        enqueue_emails([
+            {'recipient': f'parent{i}@test.com', 'subject': 'Convocation', 'body': 'Corps', 'convocation_id': c.id}
+            for i, c in enumerate(self.convocations)
+        ])
+        mark_convocations_sent([self.convocations[0].id])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/events/{self.event.id}/delivery/')
+
+        self.assertEqual(response.data['convocations']['total'], 4)
+        self.assertEqual(response.data['convocations']['sent'], 1)
+        self.assertEqual(response.data['outbox']['pending'], 4)
+        self.assertEqual(response.data['progress'], 0.25)
+        self.assertTrue(response.data['in_progress'])
+
+        self.assertEqual(APIClient().get(f'/api/events/{self.event.id}/delivery/').status_code, 401)
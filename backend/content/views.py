@@ -1,6 +1,10 @@
+from django.db.models import Count, Q
 from rest_framework import viewsets
-from rest_framework.permissions import AllowAny
-from .models import Event, GalleryImage
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from communications.models import OutboxEmail
+from .models import Convocation, Event, GalleryImage
 from .serializers import EventSerializer, GalleryImageSerializer
 
 class EventViewSet(viewsets.ModelViewSet):
@@ -8,6 +12,29 @@ class EventViewSet(viewsets.ModelViewSet):
     serializer_class = EventSerializer
     permission_classes = [AllowAny]
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAdminUser])
+    def delivery(self, request, pk=None):
+        """
+        Avancement de l'envoi des convocations d'un événement : deux agrégats,
+        sans charger les convocations (conçu pour être interrogé régulièrement).
+        """
+        event = self.get_object()
+        convocations = Convocation.objects.filter(event=event).aggregate(
+            total=Count('id'),
+            **{status.lower(): Count('id', filter=Q(status=status)) for status, _ in Convocation.STATUS_CHOICES}
+        )
+        outbox = OutboxEmail.objects.filter(convocation__event=event).aggregate(
+            **{status.lower(): Count('id', filter=Q(status=status)) for status, _ in OutboxEmail.STATUS_CHOICES}
+        )
+        delivered = convocations['total'] - convocations['pending']
+        return Response({
+            'event': event.id,
+            'convocations': convocations,
+            'outbox': outbox,
+            'progress': round(delivered / convocations['total'], 3) if convocations['total'] else None,
+            'in_progress': bool(outbox['pending'] + outbox['sending'] + outbox['failed']),
+        })
+
 class GalleryImageViewSet(viewsets.ModelViewSet):
     queryset = GalleryImage.objects.all()
     serializer_class = GalleryImageSerializer
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from .services import StatisticsCalculator
+
+STATISTICS_VERSION_KEY = 'statistics:version'
+STATISTICS_HITS_KEY = 'statistics:hits'
+STATISTICS_MISSES_KEY = 'statistics:misses'
+
+
+def _statistics_version():
+    cache.add(STATISTICS_VERSION_KEY, 1, timeout=None)
+    return cache.get(STATISTICS_VERSION_KEY, 1)
+
+
+def _statistics_key(season_id):
+    return f"statistics:v{_statistics_version()}:season:{season_id}"
+
+
+def _increment(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # La clé a expiré ou a été évincée entre add() et incr()
+        cache.set(key, 1, timeout=None)
+
+
+def get_season_statistics(season):
+    """
+    Retourne les statistiques d'une saison depuis le cache, en les calculant si besoin.
+    Retourne un tuple (statistiques, trouvé_en_cache).
+    """
+    key = _statistics_key(season.id)
+    data = cache.get(key)
+    if data is not None:
+        _increment(STATISTICS_HITS_KEY)
+        return data, True
+
+    _increment(STATISTICS_MISSES_KEY)
+    data = StatisticsCalculator.compute(season)
+    cache.set(key, data, timeout=settings.STATISTICS_CACHE_TIMEOUT)
+    return data, False
+
+
+def invalidate_season_statistics(season_id=None):
+    """
+    Invalide les statistiques d'une saison, ou de toutes les saisons si aucune n'est précisée
+    (changement d'un adhérent ou d'une catégorie, qui peut concerner plusieurs saisons).
+    """
+    if season_id is not None:
+        cache.delete(_statistics_key(season_id))
+        return
+    _statistics_version()
+    try:
+        cache.incr(STATISTICS_VERSION_KEY)
+    except ValueError:
+        cache.set(STATISTICS_VERSION_KEY, 1, timeout=None)
+
+
+def get_statistics_cache_counters():
+    hits = cache.get(STATISTICS_HITS_KEY, 0)
+    misses = cache.get(STATISTICS_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 3) if total else None
+    }
@@ -0,0 +1,25 @@
+import django_filters
+from .models import Registration
+
+
+class RegistrationFilter(django_filters.FilterSet):
+    """
+    Filtres des inscriptions (onglet Finances, exports).
+    Les filtres sur le reste à payer s'appuient sur l'instantané de tarif indexé.
+    """
+    season_id = django_filters.NumberFilter(field_name='season_id')
+    has_balance = django_filters.BooleanFilter(method='filter_has_balance')
+
+    class Meta:
+        model = Registration
+        fields = {
+            'status': ['exact'],
+            'paid': ['exact'],
+            'category': ['exact'],
+            'remaining_to_pay': ['gt', 'gte', 'lt', 'lte'],
+        }
+
+    def filter_has_balance(self, queryset, name, value):
+        if value:
+            return queryset.filter(remaining_to_pay__gt=0)
+        return queryset.filter(remaining_to_pay=0)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+from functools import lru_cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import get_template
+from .pdf_generator import CLUB_INFO, INVOICE_TEMPLATE, generate_invoice_pdf
+
+INVOICE_CACHE_DIR = 'invoices/cache'
+
+
+@lru_cache(maxsize=None)
+def template_version():
+    """
+    Empreinte du gabarit de facture : modifier le gabarit invalide tous les PDF en cache.
+    """
+    source = get_template(INVOICE_TEMPLATE).template.source
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def invoice_fingerprint(invoice):
+    """
+    Empreinte de tout ce qui apparaît sur la facture (facture, adhérent, inscription, gabarit).
+    """
+    registration = invoice.registration
+    member = invoice.member
+    content = {
+        'invoice': [invoice.id, str(invoice.amount), str(invoice.date_issued), invoice.status, invoice.description],
+        'member': [member.first_name, member.last_name, member.address, str(member.birth_date)],
+        'registration': [registration.category.name, registration.season.name] if registration else None,
+        'club': CLUB_INFO,
+        'template': template_version(),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def invoice_directory(invoice_id):
+    return f"{INVOICE_CACHE_DIR}/{invoice_id}"
+
+
+def get_invoice_pdf(invoice):
+    """
+    Retourne (chemin dans le stockage, empreinte) du PDF de la facture,
+    en le générant seulement s'il n'existe pas encore pour cette empreinte.
+    Retourne (None, empreinte) si la génération échoue.
+    """
+    fingerprint = invoice_fingerprint(invoice)
+    path = f"{invoice_directory(invoice.id)}/{fingerprint}.pdf"
+    if default_storage.exists(path):
+        return path, fingerprint
+
+    pdf = generate_invoice_pdf(invoice)
+    if not pdf:
+        return None, fingerprint
+    # Les versions précédentes (adhérent ou gabarit modifié) ne servent plus
+    invalidate_invoice_pdf(invoice.id)
+    return default_storage.save(path, ContentFile(pdf)), fingerprint
+
+
+def invalidate_invoice_pdf(invoice_id):
+    """
+    Supprime les PDF en cache d'une facture.
+    """
+    directory = invoice_directory(invoice_id)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(f"{directory}/{name}")
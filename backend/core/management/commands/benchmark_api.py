@@ -0,0 +1,177 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendance.cache import invalidate_rosters
+from core.cache import invalidate_season_statistics
+from core.models import Member, Registration
+from core.seeding import Seeder
+from attendance.models import Attendance, Session
+
+
+# Cache privé le temps du benchmark : vider le cache « à froid » ne doit pas toucher au cache
+# partagé (Redis) de l'application, ni y laisser les statistiques des données générées
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark-api',
+    },
+}
+
+
+class Rollback(Exception):
+    """
+    Levée en fin de benchmark pour annuler les données générées.
+    """
+
+
+class Command(BaseCommand):
+    help = 'Mesure les performances des principaux endpoints de l\'API (latences p50/p95/p99, requêtes SQL, mémoire)'
+
+    # (nom, url, utilisateur : 'admin' ou 'parent', vider le cache avant chaque appel)
+    ENDPOINTS = [
+        ('registrations', '/api/registrations/', 'admin', False),
+        ('my-family', '/api/my-family/', 'parent', False),
+        ('statistics', '/api/statistics/', 'admin', False),
+        ('statistics (cold cache)', '/api/statistics/', 'admin', True),
+        ('sessions', '/api/sessions/', 'admin', False),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--families', type=int, default=200, help='Familles générées avant la mesure (0 : données existantes)')
+        parser.add_argument('--seasons', type=int, default=1, help='Nombre de saisons générées')
+        parser.add_argument('--sessions', type=int, default=10, help='Séances générées par cours')
+        parser.add_argument('--attendance-density', type=float, default=0.8, help='Proportion des élèves ayant une présence par séance')
+        parser.add_argument('--seed', type=int, default=0, help='Graine aléatoire du jeu de données')
+        parser.add_argument('--iterations', type=int, default=30, help='Nombre d\'appels mesurés par endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Appels de chauffe non mesurés par endpoint')
+        parser.add_argument('--output', default='benchmark.json', help='Fichier JSON de résultats')
+        parser.add_argument('--keep-data', action='store_true', help='Conserver les données générées (annulées par défaut)')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations doit être au moins 1')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup ne peut pas être négatif')
+
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES), transaction.atomic():
+                dataset = self.seed(options)
+                results = self.run_benchmark(options)
+                if not options['keep_data']:
+                    raise Rollback()
+        except Rollback:
+            pass
+        else:
+            # Données conservées : le cache partagé ne doit pas servir les chiffres d'avant
+            invalidate_season_statistics()
+            invalidate_rosters()
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'database': connection.vendor,
+            },
+            'parameters': {key: options[key] for key in ('families', 'seasons', 'sessions', 'attendance_density', 'seed', 'iterations', 'warmup')},
+            'dataset': dataset,
+            'endpoints': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<26} p50={result['p50_ms']:>8.1f}ms p95={result['p95_ms']:>8.1f}ms "
+                f"p99={result['p99_ms']:>8.1f}ms queries={result['queries']:>4} peak={result['peak_memory_kb']:>8.0f}KB"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Résultats enregistrés dans {options['output']}"))
+
+    def seed(self, options):
+        if options['families']:
+            seeder = Seeder(seed=options['seed'])
+            *history, season = seeder.seed_seasons(options['seasons'])
+            categories = seeder.seed_categories()
+            seeder.seed_families(options['families'], season, categories, history=history)
+            seeder.seed_invoices(season)
+            seeder.seed_events(convocations_per_event=min(options['families'], 50))
+            if options['sessions']:
+                seeder.seed_sessions(season, options['sessions'], options['attendance_density'])
+        return {
+            'members': Member.objects.count(),
+            'registrations': Registration.objects.count(),
+            'sessions': Session.objects.count(),
+            'attendances': Attendance.objects.count(),
+        }
+
+    def clients(self):
+        admin = User.objects.filter(is_superuser=True).first() or User.objects.create_superuser('benchmark', '', None)
+        # Famille la plus nombreuse : cas le plus coûteux du tableau de bord famille
+        parent = User.objects.annotate(child_count=Count('children')).order_by('-child_count').first()
+        clients = {}
+        for role, user in (('admin', admin), ('parent', parent)):
+            client = APIClient()
+            client.force_authenticate(user)
+            clients[role] = client
+        return clients
+
+    @override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False)
+    def run_benchmark(self, options):
+        clients = self.clients()
+        results = {}
+        for name, url, role, cold_cache in self.ENDPOINTS:
+            client = clients[role]
+
+            def call():
+                if cold_cache:
+                    cache.clear()
+                return client.get(url)
+
+            for _ in range(options['warmup']):
+                call()
+
+            # Un appel instrumenté : requêtes SQL, pic mémoire et taille de la réponse
+            # (connection.queries est vidé au début de chaque requête, d'où le compteur dédié)
+            queries = []
+
+            def count_query(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            tracemalloc.start()
+            with connection.execute_wrapper(count_query):
+                response = call()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            # Appels chronométrés, sans instrumentation
+            durations = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                call()
+                durations.append((time.perf_counter() - started) * 1000)
+
+            percentiles = statistics.quantiles(durations, n=100, method='inclusive') if len(durations) > 1 else durations * 99
+            results[name] = {
+                'url': url,
+                'status_code': response.status_code,
+                'p50_ms': round(percentiles[49], 2),
+                'p95_ms': round(percentiles[94], 2),
+                'p99_ms': round(percentiles[98], 2),
+                'mean_ms': round(statistics.fmean(durations), 2),
+                'queries': len(queries),
+                'peak_memory_kb': round(peak / 1024, 1),
+                'response_bytes': len(response.content),
+            }
+        return results
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from core.cache import invalidate_season_statistics
+from core.models import Registration
+from core.services import PriceCalculator
+
+
+class Command(BaseCommand):
+    help = 'Recalcule l\'instantané de tarif (rang familial, prix final, reste à payer) des inscriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--season',
+            type=int,
+            help='Limiter le recalcul à une saison (id)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre d\'inscriptions traitées par lot',
+        )
+
+    def handle(self, *args, **options):
+        registrations = Registration.objects.select_related('member', 'category').order_by('pk')
+        if options['season']:
+            registrations = registrations.filter(season_id=options['season'])
+
+        batch_size = options['batch_size']
+        total = 0
+        batch = []
+        for registration in registrations.iterator(chunk_size=batch_size):
+            batch.append(registration)
+            if len(batch) >= batch_size:
+                total += len(PriceCalculator.refresh_snapshots(batch))
+                batch = []
+        if batch:
+            total += len(PriceCalculator.refresh_snapshots(batch))
+
+        invalidate_season_statistics()
+        self.stdout.write(self.style.SUCCESS(f"{total} inscriptions recalculées."))
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_paymentoption_alter_registration_payment_mode_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='family_discount_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True, verbose_name='Réduction familiale (€)'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='family_rank',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='Rang familial'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='final_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True, verbose_name='Prix final'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='remaining_to_pay',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True, verbose_name='Reste à payer'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['season', 'remaining_to_pay'], name='core_regist_season__b53e69_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_registration_family_discount_amount_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière modification')),
+                ('target', models.CharField(choices=[('REGISTRATIONS', 'Inscriptions'), ('MEMBERS', 'Adhérents')], default='REGISTRATIONS', max_length=20, verbose_name='Données exportées')),
+                ('format', models.CharField(choices=[('xlsx', 'Excel'), ('csv', 'CSV'), ('ndjson', 'NDJSON')], default='xlsx', max_length=10, verbose_name='Format')),
+                ('filters', models.JSONField(blank=True, default=dict, verbose_name='Filtres')),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('RUNNING', 'En cours'), ('DONE', 'Terminé'), ('FAILED', 'Échoué')], default='PENDING', max_length=20, verbose_name='Statut')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='Lignes à exporter')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='Lignes exportées')),
+                ('file', models.FileField(blank=True, upload_to='exports/', verbose_name='Fichier')),
+                ('error_message', models.TextField(blank=True, verbose_name="Message d'erreur")),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Demandé par')),
+            ],
+            options={
+                'verbose_name': 'Export',
+                'verbose_name_plural': 'Exports',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['season', 'category'], name='core_regist_season__396cc6_idx'),
+        ),
+    ]
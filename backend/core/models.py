@@ -221,6 +221,12 @@ class Registration(TimeStampedModel):
     has_supplementary_discipline = models.BooleanField(_("Discipline supplémentaire (+40€)"), default=False)
     notes = models.TextField(_("Notes internes"), blank=True)
 
+    # Instantané du tarif, maintenu par PriceCalculator.refresh_snapshots (voir core/signals.py)
+    family_rank = models.PositiveSmallIntegerField(_("Rang familial"), null=True, blank=True, editable=False)
+    family_discount_amount = models.DecimalField(_("Réduction familiale (€)"), max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+    final_price = models.DecimalField(_("Prix final"), max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+    remaining_to_pay = models.DecimalField(_("Reste à payer"), max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+
     class Meta:
         verbose_name = _("Inscription")
         verbose_name_plural = _("Inscriptions")
@@ -229,6 +235,8 @@ class Registration(TimeStampedModel):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['paid']),
+            models.Index(fields=['season', 'remaining_to_pay']),
+            models.Index(fields=['season', 'category']),
         ]
 
     def __str__(self):
@@ -270,3 +278,54 @@ class Invoice(TimeStampedModel):
 
     def __str__(self):
         return f"Facture #{self.id} - {self.member} - {self.amount}€"
+
+
+class ExportJob(TimeStampedModel):
+    """
+    Modèle représentant un export exécuté en tâche de fond (Celery).
+    Le fichier produit est stocké dans MEDIA_ROOT/exports/.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', _('En attente')),
+        ('RUNNING', _('En cours')),
+        ('DONE', _('Terminé')),
+        ('FAILED', _('Échoué')),
+    ]
+
+    TARGET_CHOICES = [
+        ('REGISTRATIONS', _('Inscriptions')),
+        ('MEMBERS', _('Adhérents')),
+    ]
+
+    FORMAT_CHOICES = [
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+
+    requested_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs', verbose_name=_("Demandé par"))
+    target = models.CharField(_("Données exportées"), max_length=20, choices=TARGET_CHOICES, default='REGISTRATIONS')
+    format = models.CharField(_("Format"), max_length=10, choices=FORMAT_CHOICES, default='xlsx')
+    filters = models.JSONField(_("Filtres"), default=dict, blank=True)
+    status = models.CharField(_("Statut"), max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    total_rows = models.PositiveIntegerField(_("Lignes à exporter"), default=0)
+    processed_rows = models.PositiveIntegerField(_("Lignes exportées"), default=0)
+    file = models.FileField(_("Fichier"), upload_to='exports/', blank=True)
+    error_message = models.TextField(_("Message d'erreur"), blank=True)
+    finished_at = models.DateTimeField(_("Terminé le"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Export")
+        verbose_name_plural = _("Exports")
+        ordering = ['-created_at']
+
+    @property
+    def progress(self):
+        if self.status == 'DONE':
+            return 100
+        if not self.total_rows:
+            return 0
+        return int(self.processed_rows * 100 / self.total_rows)
+
+    def __str__(self):
+        return f"Export #{self.id} - {self.get_target_display()} ({self.format}) - {self.status}"
@@ -1,20 +1,32 @@
 from django.template.loader import render_to_string
-from weasyprint import HTML
 
-def generate_invoice_pdf(invoice):
+INVOICE_TEMPLATE = 'invoices/invoice_template.html'
+
+CLUB_INFO = {
+    'club_name': "Judo Club Hem",
+    'club_address': "Rue des Écoles, 59510 Hem",
+    'club_siret': "123 456 789 00012",
+}
+
+def get_invoice_context(invoice):
     """
-    Génère le PDF d'une facture avec WeasyPrint.
+    Contexte de rendu d'une facture.
     """
-    context = {
+    return {
         'invoice': invoice,
         'member': invoice.member,
         'registration': invoice.registration,
         'season': invoice.registration.season,
-        'club_name': "Judo Club Hem",
-        'club_address': "Rue des Écoles, 59510 Hem",
-        'club_siret': "123 456 789 00012",
+        **CLUB_INFO,
     }
-    
-    html_string = render_to_string('invoices/invoice_template.html', context)
+
+def generate_invoice_pdf(invoice):
+    """
+    Génère le PDF d'une facture avec WeasyPrint.
+    """
+    # Import tardif : WeasyPrint dépend de bibliothèques système (Pango) chargées à l'import
+    from weasyprint import HTML
+
+    html_string = render_to_string(INVOICE_TEMPLATE, get_invoice_context(invoice))
     pdf = HTML(string=html_string).write_pdf()
     return pdf
@@ -0,0 +1,32 @@
+from rest_framework import renderers
+
+
+class ExportRenderer(renderers.BaseRenderer):
+    """
+    Renderer des exports de fichiers.
+    Les vues d'export renvoient directement un HttpResponse / StreamingHttpResponse : ce renderer
+    sert uniquement à la négociation de `?format=` ; seules les réponses d'erreur passent par render().
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return renderers.JSONRenderer().render(data)
+
+
+class XLSXRenderer(ExportRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+EXPORT_RENDERER_CLASSES = [renderers.JSONRenderer, XLSXRenderer, CSVRenderer, NDJSONRenderer]
@@ -0,0 +1,243 @@
+"""
+Génération de données de test (commande seed_data, tests de performance).
+Les lignes sont insérées par lots (bulk_create) : aucun signal n'est émis, l'instantané de tarif
+et le cache des statistiques sont donc mis à jour explicitement en fin de génération.
+"""
+import random
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from core.cache import invalidate_season_statistics
+from core.models import Season, Category, Member, Registration, Invoice
+from core.services import PriceCalculator
+from content.models import Event, Convocation
+from attendance.cache import invalidate_rosters
+from attendance.models import Course, Session, Attendance
+from attendance.services import AttendanceRollupService
+
+CATEGORIES_DATA = [
+    {'name': 'Eveil Judo', 'code': 'EVEIL', 'price': 180, 'age_min': 4, 'age_max': 5},
+    {'name': 'Mini-Poussins', 'code': 'MINI', 'price': 190, 'age_min': 6, 'age_max': 7},
+    {'name': 'Poussins', 'code': 'POUSSIN', 'price': 200, 'age_min': 8, 'age_max': 9},
+    {'name': 'Benjamins', 'code': 'BENJAMIN', 'price': 210, 'age_min': 10, 'age_max': 11},
+    {'name': 'Minimes', 'code': 'MINIME', 'price': 220, 'age_min': 12, 'age_max': 13},
+    {'name': 'Cadets', 'code': 'CADET', 'price': 230, 'age_min': 14, 'age_max': 16},
+    {'name': 'Juniors/Seniors', 'code': 'ADULTE', 'price': 240, 'age_min': 17, 'age_max': 99},
+]
+
+EVENTS_DATA = [
+    {'title': 'Tournoi de Rentrée', 'type': 'COMPETITION', 'delta_days': 15},
+    {'title': 'Stage Toussaint', 'type': 'TRAINING', 'delta_days': 45},
+    {'title': 'Coupe de Noël', 'type': 'COMPETITION', 'delta_days': 90},
+    {'title': 'Interclubs Régional', 'type': 'COMPETITION', 'delta_days': 120},
+]
+
+ATTENDANCE_STATUSES = ['PRESENT', 'PRESENT', 'PRESENT', 'ABSENT', 'EXCUSED']
+
+
+class Seeder:
+    """
+    Générateur de données déterministe : un même `seed` produit les mêmes familles.
+    """
+
+    def __init__(self, seed=None, batch_size=2000):
+        self.fake = Faker('fr_FR')
+        self.random = random.Random(seed)
+        if seed is not None:
+            self.fake.seed_instance(seed)
+        self.batch_size = batch_size
+        # Le hachage du mot de passe est coûteux : calculé une seule fois pour tous les parents
+        self.password = make_password('password123')
+
+    def seed_season(self, name='2024-2025', start_date=date(2024, 9, 1), end_date=date(2025, 6, 30), is_active=True):
+        season, _ = Season.objects.get_or_create(
+            name=name,
+            defaults={'start_date': start_date, 'end_date': end_date, 'is_active': is_active}
+        )
+        return season
+
+    def seed_seasons(self, count, last_start_year=2024):
+        """
+        Crée `count` saisons consécutives, de la plus ancienne à la plus récente (active).
+        """
+        seasons = []
+        for start_year in range(last_start_year - count + 1, last_start_year + 1):
+            seasons.append(self.seed_season(
+                name=f"{start_year}-{start_year + 1}",
+                start_date=date(start_year, 9, 1),
+                end_date=date(start_year + 1, 6, 30),
+                is_active=start_year == last_start_year
+            ))
+        return seasons
+
+    def seed_categories(self):
+        categories = []
+        for cat_data in CATEGORIES_DATA:
+            category, _ = Category.objects.get_or_create(code=cat_data['code'], defaults=cat_data)
+            categories.append(category)
+        return categories
+
+    def _category_for(self, categories, season, birth_date):
+        # Find suitable category based on age
+        age = season.start_date.year + 1 - birth_date.year
+        return next((c for c in categories if c.age_min <= age <= c.age_max), categories[-1])
+
+    def seed_families(self, count, season, categories, history=()):
+        """
+        Crée `count` parents (User) avec 1 à 3 enfants inscrits à la saison.
+        `history` : saisons précédentes, auxquelles chaque enfant a une chance sur deux d'être inscrit.
+        Retourne la liste des parents créés.
+        """
+        user_offset = (User.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+        member_offset = (Member.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+        # Create Parents
+        parents = User.objects.bulk_create([
+            User(
+                username=f"{self.fake.user_name()}{user_offset + index}",
+                email=self.fake.email(),
+                password=self.password,
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name()
+            )
+            for index in range(count)
+        ], batch_size=self.batch_size)
+
+        # Create 1 to 3 children per parent
+        members = []
+        for parent in parents:
+            for _ in range(self.random.randint(1, 3)):
+                gender = self.random.choice(['M', 'F'])
+                members.append(Member(
+                    parent=parent,
+                    first_name=self.fake.first_name_male() if gender == 'M' else self.fake.first_name_female(),
+                    last_name=parent.last_name,
+                    birth_date=self.fake.date_of_birth(minimum_age=4, maximum_age=18),
+                    gender=gender,
+                    address=self.fake.address(),
+                    has_passport=self.random.choice([True, False]),
+                    license_number=f"{self.fake.lexify('??').upper()}{member_offset + len(members):08d}",
+                    belt=self.random.choice(Member.BELT_CHOICES)[0]
+                ))
+        members = Member.objects.bulk_create(members, batch_size=self.batch_size)
+
+        # Register members to season (and to part of the previous seasons)
+        registrations = []
+        validated = Counter()
+        for member in members:
+            member_seasons = [season] + [past for past in history if self.random.random() < 0.5]
+            for member_season in member_seasons:
+                registration = Registration(
+                    member=member,
+                    season=member_season,
+                    category=self._category_for(categories, member_season, member.birth_date),
+                    status=self.random.choice(['VALIDATED', 'PENDING', 'VALIDATED', 'VALIDATED']), # Mostly validated
+                    paid=self.random.choice([True, False]) if member_season == season else True
+                )
+                registrations.append(registration)
+                if registration.status == 'VALIDATED':
+                    validated[member.parent_id, member_season.id] += 1
+
+        # Instantané de tarif calculé avant insertion (les familles créées ici sont complètes),
+        # ce qui évite un bulk_update coûteux après coup
+        for registration in registrations:
+            siblings = validated[registration.member.parent_id, registration.season_id]
+            if registration.status == 'VALIDATED':
+                siblings -= 1
+            PriceCalculator.apply_snapshot(registration, PriceCalculator.price_for_rank(registration, siblings + 1))
+        Registration.objects.bulk_create(registrations, batch_size=self.batch_size)
+
+        invalidate_season_statistics()
+        invalidate_rosters()
+        return parents
+
+    def seed_invoices(self, season):
+        registrations = Registration.objects.filter(season=season, invoices__isnull=True)
+        Invoice.objects.bulk_create([
+            Invoice(
+                registration_id=registration.id,
+                member_id=registration.member_id,
+                amount=registration.final_price or Decimal('0.00'),
+                date_issued=season.start_date,
+                status='PAID' if registration.paid else 'PENDING'
+            )
+            for registration in registrations.iterator(chunk_size=self.batch_size)
+        ], batch_size=self.batch_size)
+
+    def seed_events(self, count=len(EVENTS_DATA), convocations_per_event=0):
+        """
+        Crée `count` événements (modèles de EVENTS_DATA répétés) et convoque à chacun
+        `convocations_per_event` adhérents tirés au hasard.
+        """
+        events = []
+        for index in range(count):
+            event_data = EVENTS_DATA[index % len(EVENTS_DATA)]
+            start_time = timezone.now() + timedelta(days=event_data['delta_days'] + 7 * (index // len(EVENTS_DATA)))
+            events.append(Event(
+                title=event_data['title'],
+                description=self.fake.text(),
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=4),
+                location=self.fake.city(),
+                type=event_data['type']
+            ))
+        events = Event.objects.bulk_create(events, batch_size=self.batch_size)
+
+        if convocations_per_event:
+            member_ids = list(Member.objects.values_list('id', flat=True))
+            Convocation.objects.bulk_create([
+                Convocation(event=event, member_id=member_id)
+                for event in events
+                for member_id in self.random.sample(member_ids, min(convocations_per_event, len(member_ids)))
+            ], batch_size=self.batch_size, ignore_conflicts=True)
+        return events
+
+    def seed_sessions(self, season, sessions_per_course=4, attendance_density=1.0):
+        """
+        Crée un cours par jour de semaine (lundi à samedi) et ses premières séances hebdomadaires.
+        Chaque adhérent inscrit à la saison suit un cours ; pour chaque séance, une proportion
+        `attendance_density` de ses élèves a une présence enregistrée.
+        """
+        courses = Course.objects.bulk_create([
+            Course(
+                name=f"Judo {Course.DAYS_OF_WEEK[day][1]}", day_of_week=day,
+                start_time='18:00', end_time='19:30', teacher=self.fake.name()
+            )
+            for day in range(6)
+        ])
+
+        sessions = []
+        for course in courses:
+            first_day = season.start_date + timedelta(days=(course.day_of_week - season.start_date.weekday()) % 7)
+            sessions.extend(
+                Session(course=course, date=first_day + timedelta(weeks=week))
+                for week in range(sessions_per_course)
+            )
+        sessions = Session.objects.bulk_create(sessions, batch_size=self.batch_size)
+
+        rosters = {course.id: [] for course in courses}
+        for member_id in Member.objects.filter(registrations__season=season).values_list('id', flat=True):
+            rosters[self.random.choice(courses).id].append(member_id)
+
+        attendances = []
+        for session in sessions:
+            for member_id in rosters[session.course_id]:
+                if self.random.random() < attendance_density:
+                    attendances.append(Attendance(
+                        session=session, member_id=member_id,
+                        status=self.random.choice(ATTENDANCE_STATUSES)
+                    ))
+            if len(attendances) >= self.batch_size:
+                Attendance.objects.bulk_create(attendances, batch_size=self.batch_size)
+                attendances = []
+        Attendance.objects.bulk_create(attendances, batch_size=self.batch_size)
+        # bulk_create ne passe pas par mark_attendance : compteurs reconstruits en une fois
+        AttendanceRollupService.rebuild(batch_size=self.batch_size)
+        return sessions
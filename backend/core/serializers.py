@@ -1,6 +1,7 @@
+from django.db import models
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from .models import Season, Category, Member, Registration, Invoice, PaymentOption
+from .models import Season, Category, Member, Registration, Invoice, PaymentOption, ExportJob
 from django.contrib.auth.models import User
 
 class UserSerializer(serializers.ModelSerializer):
@@ -52,6 +53,22 @@ class PaymentOptionSerializer(serializers.ModelSerializer):
         model = PaymentOption
         fields = ['id', 'name', 'installments', 'is_active']
 
+class RegistrationListSerializer(serializers.ListSerializer):
+    """
+    Sérialisation en lot des inscriptions.
+    Les inscriptions disposant d'un instantané de tarif l'utilisent directement ; les prix des autres
+    sont calculés en une seule passe (PriceCalculator.calculate_prices) et transmis aux serializers
+    enfants via le contexte, au lieu d'une requête par ligne.
+    """
+    def to_representation(self, data):
+        registrations = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'prices' not in self.context:
+            from .services import PriceCalculator
+            self.context['prices'] = PriceCalculator.calculate_prices(
+                reg for reg in registrations if reg.final_price is None
+            )
+        return super().to_representation(registrations)
+
 class RegistrationSerializer(serializers.ModelSerializer):
     """
     Serializer pour les inscriptions.
@@ -77,13 +94,19 @@ class RegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Registration
         fields = ['id', 'member', 'season', 'category', 'status', 'paid', 'member_id', 'season_id', 'category_id', 'discount_percentage', 'discount_amount', 'payment_mode', 'payment_option', 'payment_option_id', 'installments_paid', 'city_hall_aid', 'city_hall_aid_amount', 'has_supplementary_discipline', 'total_to_pay', 'amount_paid', 'remaining_to_pay']
+        list_serializer_class = RegistrationListSerializer
 
     def get_payment_details(self, obj):
         if not hasattr(self, '_payment_details_cache'):
             self._payment_details_cache = {}
         if obj.id not in self._payment_details_cache:
             from .services import PriceCalculator
-            self._payment_details_cache[obj.id] = PriceCalculator.get_payment_details(obj)
+            details = PriceCalculator.get_snapshot_payment_details(obj)
+            if details is None:
+                # Prix pré-calculés en lot (liste, tableau de bord famille) si disponibles
+                price_data = self.context.get('prices', {}).get(obj.id)
+                details = PriceCalculator.get_payment_details(obj, price_data)
+            self._payment_details_cache[obj.id] = details
         return self._payment_details_cache[obj.id]
 
     def get_total_to_pay(self, obj):
@@ -99,3 +122,23 @@ class InvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Invoice
         fields = '__all__'
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer des exports en tâche de fond.
+    Les filtres des inscriptions sont ceux de l'API (/api/registrations/?season_id=...&status=...).
+    """
+    progress = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ExportJob
+        fields = ['id', 'target', 'format', 'filters', 'status', 'total_rows', 'processed_rows', 'progress', 'error_message', 'created_at', 'finished_at']
+        read_only_fields = ['status', 'total_rows', 'processed_rows', 'error_message', 'finished_at']
+
+    def validate(self, attrs):
+        if attrs.get('target', 'REGISTRATIONS') == 'REGISTRATIONS':
+            from .filters import RegistrationFilter
+            filterset = RegistrationFilter(attrs.get('filters') or {}, queryset=Registration.objects.none())
+            if not filterset.is_valid():
+                raise serializers.ValidationError({'filters': filterset.errors})
+        return attrs
@@ -1,6 +1,10 @@
+from collections import Counter
 from decimal import Decimal
+from django.db.models import Count, DecimalField, Q, Sum
 from .models import Registration
 
+CENT = Decimal('0.01')
+
 class PriceCalculator:
     """
     Service pour calculer le prix d'une inscription en appliquant les réductions familiales.
@@ -15,21 +19,62 @@ class PriceCalculator:
         - 2ème enfant : -10%
         - 3ème enfant et + : -20%
         """
-        category_price = registration.category.price
-        
         # Récupérer les autres inscriptions de la même famille (même parent) pour la même saison
         # On exclut l'inscription actuelle si elle existe déjà
         siblings_registrations = Registration.objects.filter(
             member__parent=registration.member.parent,
             season=registration.season,
             status='VALIDATED' # On ne compte que les inscriptions validées ou en cours de paiement
-        ).exclude(id=registration.id).order_by('created_at')
+        ).exclude(id=registration.id)
         
         count = siblings_registrations.count()
         
         # L'inscription actuelle est la (count + 1)ème
-        rank = count + 1
-        
+        return PriceCalculator.price_for_rank(registration, count + 1)
+
+    @staticmethod
+    def calculate_prices(registrations):
+        """
+        Calcule les prix d'un lot d'inscriptions en une seule requête de comptage.
+        Le nombre d'inscriptions validées est agrégé par (parent, saison), puis le rang
+        de chaque inscription en est déduit sans requête supplémentaire.
+        Retourne un dictionnaire {id de l'inscription: détails du prix}.
+        """
+        registrations = list(registrations)
+        if not registrations:
+            return {}
+
+        parent_ids = {reg.member.parent_id for reg in registrations}
+        season_ids = {reg.season_id for reg in registrations}
+
+        family_filter = Q(member__parent_id__in=[pid for pid in parent_ids if pid is not None])
+        if None in parent_ids:
+            # Même comportement que calculate_price : les adhérents sans parent forment une "famille"
+            family_filter |= Q(member__parent__isnull=True)
+
+        validated_counts = {
+            (row['member__parent'], row['season']): row['count']
+            for row in Registration.objects.filter(family_filter, season_id__in=season_ids, status='VALIDATED')
+            .values('member__parent', 'season')
+            .annotate(count=Count('id'))
+        }
+
+        prices = {}
+        for reg in registrations:
+            count = validated_counts.get((reg.member.parent_id, reg.season_id), 0)
+            if reg.status == 'VALIDATED':
+                # L'inscription est elle-même comptée : on l'exclut comme dans calculate_price
+                count -= 1
+            prices[reg.id] = PriceCalculator.price_for_rank(reg, count + 1)
+        return prices
+
+    @staticmethod
+    def price_for_rank(registration, rank):
+        """
+        Applique les règles de tarification pour un rang familial déjà connu.
+        """
+        category_price = registration.category.price
+
         discount_percentage = Decimal('0.00')
         
         if rank == 2:
@@ -73,11 +118,13 @@ class PriceCalculator:
         }
 
     @staticmethod
-    def get_payment_details(registration):
+    def get_payment_details(registration, price_data=None):
         """
         Calcule le total à payer, le montant déjà payé et le reste à payer.
+        `price_data` permet de réutiliser un prix déjà calculé (ex: via calculate_prices).
         """
-        price_data = PriceCalculator.calculate_price(registration)
+        if price_data is None:
+            price_data = PriceCalculator.calculate_price(registration)
         total_to_pay = price_data['final_price']
         
         amount_paid = Decimal('0.00')
@@ -99,3 +146,128 @@ class PriceCalculator:
             'amount_paid': amount_paid,
             'remaining_to_pay': remaining_to_pay
         }
+
+    @staticmethod
+    def refresh_snapshots(registrations, batch_size=500):
+        """
+        Recalcule et enregistre l'instantané de tarif (rang, réduction familiale,
+        prix final, reste à payer) des inscriptions données.
+        Utilise bulk_update : aucun signal n'est déclenché.
+        """
+        registrations = list(registrations)
+        prices = PriceCalculator.calculate_prices(registrations)
+        for reg in registrations:
+            PriceCalculator.apply_snapshot(reg, prices[reg.id])
+        Registration.objects.bulk_update(
+            registrations,
+            ['family_rank', 'family_discount_amount', 'final_price', 'remaining_to_pay'],
+            batch_size=batch_size,
+        )
+        return registrations
+
+    @staticmethod
+    def apply_snapshot(registration, price_data):
+        """
+        Renseigne (sans enregistrer) l'instantané de tarif d'une inscription à partir de son prix calculé.
+        """
+        payment = PriceCalculator.get_payment_details(registration, price_data)
+        registration.family_rank = price_data['rank']
+        registration.family_discount_amount = price_data['family_discount_amount'].quantize(CENT)
+        registration.final_price = payment['total_to_pay'].quantize(CENT)
+        registration.remaining_to_pay = payment['remaining_to_pay'].quantize(CENT)
+
+    @staticmethod
+    def refresh_family_snapshots(parent_id, season_id):
+        """
+        Recalcule l'instantané de toutes les inscriptions d'une famille pour une saison :
+        le statut d'une inscription modifie le rang (et donc le prix) de ses frères et sœurs.
+        """
+        family = Registration.objects.filter(season_id=season_id)
+        if parent_id is None:
+            family = family.filter(member__parent__isnull=True)
+        else:
+            family = family.filter(member__parent_id=parent_id)
+        return PriceCalculator.refresh_snapshots(family.select_related('member', 'category'))
+
+    @staticmethod
+    def get_snapshot_payment_details(registration):
+        """
+        Détails de paiement lus depuis l'instantané enregistré, sans recalcul.
+        Retourne None si l'instantané n'a pas encore été calculé.
+        """
+        if registration.final_price is None or registration.remaining_to_pay is None:
+            return None
+        return {
+            'total_to_pay': registration.final_price,
+            'amount_paid': registration.final_price - registration.remaining_to_pay,
+            'remaining_to_pay': registration.remaining_to_pay
+        }
+
+
+class StatisticsCalculator:
+    """
+    Service de calcul des indicateurs d'une saison (tableau de bord administrateur).
+    """
+
+    @staticmethod
+    def compute(season):
+        """
+        Calcule les KPI d'une saison à partir d'une seule requête groupée.
+        Chaque ligne du résultat correspond à une combinaison (catégorie, genre, discipline,
+        ceinture, payé) : les répartitions et totaux sont obtenus en repliant ces lignes.
+        Les montants proviennent de l'instantané de tarif (règles de PriceCalculator).
+        """
+        amount = DecimalField(max_digits=12, decimal_places=2)
+        rows = Registration.objects.filter(season=season).values(
+            'category__name', 'member__gender', 'member__discipline', 'member__belt', 'paid'
+        ).annotate(
+            count=Count('id'),
+            unpriced=Count('id', filter=Q(final_price__isnull=True)),
+            expected=Sum('final_price', output_field=amount),
+            outstanding=Sum('remaining_to_pay', output_field=amount),
+        ).order_by()
+
+        per_category, per_gender, per_discipline, per_belt = Counter(), Counter(), Counter(), Counter()
+        payment_status = {'paid': 0, 'unpaid': 0}
+        expected_revenue = Decimal('0.00')
+        outstanding_revenue = Decimal('0.00')
+        unpriced = 0
+
+        for row in rows:
+            count = row['count']
+            per_category[row['category__name']] += count
+            per_gender[row['member__gender']] += count
+            per_discipline[row['member__discipline']] += count
+            per_belt[row['member__belt']] += count
+            payment_status['paid' if row['paid'] else 'unpaid'] += count
+            expected_revenue += row['expected'] or 0
+            outstanding_revenue += row['outstanding'] or 0
+            unpriced += row['unpriced']
+
+        if unpriced:
+            # Inscriptions sans instantané (non encore recalculées) : tarif calculé en lot
+            missing = list(
+                Registration.objects.filter(season=season, final_price__isnull=True)
+                .select_related('member', 'category')
+            )
+            prices = PriceCalculator.calculate_prices(missing)
+            for reg in missing:
+                payment = PriceCalculator.get_payment_details(reg, prices[reg.id])
+                expected_revenue += payment['total_to_pay']
+                outstanding_revenue += payment['remaining_to_pay']
+
+        def distribution(counter, key):
+            return [{key: value, 'count': count} for value, count in counter.most_common()]
+
+        return {
+            'season': season.name,
+            'registrations_per_category': distribution(per_category, 'category__name'),
+            'gender_distribution': distribution(per_gender, 'gender'),
+            'discipline_distribution': distribution(per_discipline, 'discipline'),
+            'belt_distribution': distribution(per_belt, 'belt'),
+            'payment_status': payment_status,
+            'total_revenue': (expected_revenue - outstanding_revenue).quantize(CENT),
+            'expected_revenue': expected_revenue.quantize(CENT),
+            'outstanding_revenue': outstanding_revenue.quantize(CENT),
+            'total_members': sum(payment_status.values())
+        }
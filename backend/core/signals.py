@@ -0,0 +1,125 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .cache import invalidate_season_statistics
+from .invoice_cache import invalidate_invoice_pdf
+from .models import Category, Invoice, Member, Registration, Season
+from .services import PriceCalculator
+
+
+# --- Instantané de tarif des inscriptions ---
+
+@receiver(pre_save, sender=Registration)
+def remember_previous_family(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    instance._previous_family = Registration.objects.filter(pk=instance.pk).values_list('member__parent_id', 'season_id').first()
+
+
+@receiver(post_save, sender=Registration)
+def refresh_registration_price_snapshot(sender, instance, raw=False, **kwargs):
+    """
+    Recalcule le tarif de la famille de l'inscription : son statut peut changer le rang des autres enfants.
+    Une inscription déplacée (autre adhérent ou autre saison) quitte aussi son ancienne famille.
+    """
+    if raw:
+        return
+    previous_family = getattr(instance, '_previous_family', None)
+    if previous_family and previous_family != (instance.member.parent_id, instance.season_id):
+        PriceCalculator.refresh_family_snapshots(*previous_family)
+    family = PriceCalculator.refresh_family_snapshots(instance.member.parent_id, instance.season_id)
+    # Reporter l'instantané sur l'instance en mémoire (utilisée par la réponse de l'API)
+    for reg in family:
+        if reg.pk == instance.pk:
+            instance.family_rank = reg.family_rank
+            instance.family_discount_amount = reg.family_discount_amount
+            instance.final_price = reg.final_price
+            instance.remaining_to_pay = reg.remaining_to_pay
+
+
+@receiver(post_delete, sender=Registration)
+def refresh_siblings_price_snapshot(sender, instance, **kwargs):
+    parent_ids = Member.objects.filter(pk=instance.member_id).values_list('parent_id', flat=True)
+    for parent_id in parent_ids:
+        PriceCalculator.refresh_family_snapshots(parent_id, instance.season_id)
+
+
+@receiver(pre_save, sender=Member)
+def remember_previous_parent(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    instance._previous_parent_id = Member.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+
+
+@receiver(post_save, sender=Member)
+def refresh_member_families_price_snapshot(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Un changement de parent déplace l'adhérent d'une famille à l'autre : les deux sont recalculées.
+    """
+    if raw or created:
+        return
+    previous_parent_id = getattr(instance, '_previous_parent_id', instance.parent_id)
+    if previous_parent_id == instance.parent_id:
+        return
+    for season_id in instance.registrations.values_list('season_id', flat=True):
+        PriceCalculator.refresh_family_snapshots(previous_parent_id, season_id)
+        PriceCalculator.refresh_family_snapshots(instance.parent_id, season_id)
+
+
+@receiver(pre_save, sender=Category)
+def remember_previous_price(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    instance._previous_price = Category.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_price_snapshot(sender, instance, created=False, raw=False, **kwargs):
+    if raw or created or getattr(instance, '_previous_price', instance.price) == instance.price:
+        return
+    PriceCalculator.refresh_snapshots(instance.registrations.select_related('member', 'category'))
+
+
+# --- Cache des statistiques du tableau de bord ---
+
+def invalidate_statistics_on_commit(season_id=None):
+    """
+    Invalide après validation de la transaction : invalidée plus tôt, une requête concurrente
+    remettrait en cache les chiffres d'avant l'écriture pour toute la durée du cache.
+    """
+    transaction.on_commit(lambda: invalidate_season_statistics(season_id))
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def invalidate_registration_statistics(sender, instance, **kwargs):
+    """
+    Invalide la saison de l'inscription, et l'ancienne saison si l'inscription a été déplacée
+    (voir remember_previous_family).
+    """
+    previous_family = getattr(instance, '_previous_family', None)
+    if previous_family and previous_family[1] != instance.season_id:
+        invalidate_statistics_on_commit(previous_family[1])
+    invalidate_statistics_on_commit(instance.season_id)
+
+
+@receiver(post_save, sender=Season)
+def invalidate_season_statistics_on_save(sender, instance, **kwargs):
+    invalidate_statistics_on_commit(instance.id)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_all_statistics(sender, instance, **kwargs):
+    invalidate_statistics_on_commit()
+
+
+# --- PDF des factures ---
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_cached_invoice_pdf(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_invoice_pdf(instance.id)
@@ -0,0 +1,63 @@
+import logging
+import tempfile
+import uuid
+
+from celery import shared_task
+from django.core.files import File
+from django.utils import timezone
+from .filters import RegistrationFilter
+from .models import ExportJob, Member, Registration
+from .utils import (
+    REGISTRATION_EXPORT_COLUMNS, MEMBER_EXPORT_COLUMNS,
+    iterate_registrations, iterate_members, track_progress, write_export,
+)
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TARGETS = {
+    # cible: (queryset, parcours par lots, colonnes, préfixe du fichier, titre de la feuille)
+    'REGISTRATIONS': (
+        lambda job: RegistrationFilter(job.filters, queryset=Registration.objects.order_by('-created_at')).qs,
+        iterate_registrations, REGISTRATION_EXPORT_COLUMNS, 'inscriptions_export', "Inscriptions",
+    ),
+    'MEMBERS': (
+        lambda job: Member.objects.order_by('last_name', 'first_name'),
+        iterate_members, MEMBER_EXPORT_COLUMNS, 'adherents_export', "Adhérents",
+    ),
+}
+
+
+@shared_task
+def run_export_job(job_id):
+    """
+    Celery task to build an export file and attach it to its ExportJob.
+    """
+    try:
+        job = ExportJob.objects.get(id=job_id)
+    except ExportJob.DoesNotExist:
+        logger.error(f"Export job {job_id} not found.")
+        return False
+
+    get_queryset, iterate, columns, filename, title = EXPORT_TARGETS[job.target]
+    jobs = ExportJob.objects.filter(id=job.id)
+
+    try:
+        queryset = get_queryset(job)
+        jobs.update(status='RUNNING', total_rows=queryset.count(), processed_rows=0)
+
+        def report_progress(count):
+            jobs.update(processed_rows=count)
+
+        with tempfile.TemporaryFile() as export_file:
+            rows = track_progress(iterate(queryset), report_progress)
+            write_export(rows, columns, job.format, export_file, title)
+            export_file.seek(0)
+            # Nom non devinable : le dossier media peut être servi publiquement
+            job.file.save(f"{filename}_{timezone.now():%Y%m%d}_{uuid.uuid4().hex}.{job.format}", File(export_file), save=False)
+
+        jobs.update(status='DONE', file=job.file.name, finished_at=timezone.now())
+        return True
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed")
+        jobs.update(status='FAILED', error_message=str(e), finished_at=timezone.now())
+        return False
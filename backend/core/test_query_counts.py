@@ -0,0 +1,106 @@
+"""
+Tests de non-régression N+1 : le nombre de requêtes de chaque endpoint ne doit pas
+dépendre du volume de données. Chaque endpoint est appelé sur un jeu de N familles,
+puis sur un jeu de 10N familles, et le nombre de requêtes doit rester identique.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import Member, Registration, Invoice
+from core.seeding import Seeder
+from attendance.models import Course, Session
+from content.models import Event
+
+FAMILIES = 2
+
+LIST_ENDPOINTS = [
+    '/api/registrations/',
+    '/api/members/',
+    '/api/invoices/',
+    '/api/seasons/',
+    '/api/categories/',
+    '/api/payment-options/',
+    '/api/users/',
+    '/api/events/',
+    '/api/gallery/',
+    '/api/courses/',
+    '/api/sessions/',
+    '/api/statistics/',
+    '/api/export-jobs/',
+]
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QueryCountTest(TestCase):
+    """
+    Compare le nombre de requêtes entre un petit jeu de données et un jeu 10 fois plus grand.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.seeder = Seeder(seed=42)
+        self.season = self.seeder.seed_season()
+        self.categories = self.seeder.seed_categories()
+        self.admin = User.objects.create_superuser('admin', 'admin@test.com', 'pwd')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def seed(self, families):
+        parents = self.seeder.seed_families(families, self.season, self.categories)
+        self.seeder.seed_invoices(self.season)
+        self.seeder.seed_events(convocations_per_event=families)
+        Course.objects.all().delete()
+        self.seeder.seed_sessions(self.season, sessions_per_course=2)
+        return parents
+
+    def count_queries(self, url, user=None):
+        cache.clear()
+        client = self.client
+        if user is not None:
+            client = APIClient()
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context)
+
+    def detail_endpoints(self):
+        registration_id = Registration.objects.first().id
+        return {
+            'registration': f'/api/registrations/{registration_id}/',
+            'registration price': f'/api/registrations/{registration_id}/price_details/',
+            'member': f'/api/members/{Member.objects.first().id}/',
+            'invoice': f'/api/invoices/{Invoice.objects.first().id}/',
+            'event': f'/api/events/{Event.objects.first().id}/',
+            'session': f'/api/sessions/{Session.objects.first().id}/',
+        }
+
+    def assert_constant(self, measure):
+        """
+        `measure` renvoie {endpoint: nombre de requêtes} pour le jeu de données courant.
+        """
+        self.seed(FAMILIES)
+        small = measure()
+        self.seed(FAMILIES * 9)
+        large = measure()
+        for endpoint, count in small.items():
+            with self.subTest(endpoint=endpoint):
+                self.assertEqual(large[endpoint], count, f"{endpoint}: {count} -> {large[endpoint]} requêtes")
+
+    def test_list_endpoints(self):
+        self.assert_constant(lambda: {url: self.count_queries(url) for url in LIST_ENDPOINTS})
+
+    def test_detail_endpoints(self):
+        self.assert_constant(lambda: {name: self.count_queries(url) for name, url in self.detail_endpoints().items()})
+
+    def test_family_dashboard(self):
+        def measure():
+            # Famille la plus nombreuse du jeu de données
+            parent = User.objects.annotate(child_count=Count('children')).order_by('-child_count', 'id').first()
+            return {'/api/my-family/': self.count_queries('/api/my-family/', user=parent)}
+        self.assert_constant(measure)
@@ -103,3 +103,523 @@ class PriceCalculatorTest(TestCase):
         details = PriceCalculator.calculate_price(reg)
         # 200 - 20 = 180
         self.assertEqual(details['final_price'], Decimal('180.00'))
+
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+
+class RegistrationFixturesMixin:
+    """
+    Saison active, catégorie et parent communs aux tests des inscriptions.
+    Le cache est vidé : les statistiques d'un test précédent ne doivent pas être servies.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.season = Season.objects.create(name='2024-2025', start_date='2024-09-01', end_date='2025-06-30', is_active=True)
+        self.category = Category.objects.create(name='Poussins', code='POUSSIN', price=Decimal('200.00'))
+        self.parent = User.objects.create(username='parent', email='parent@test.com')
+
+    def create_member(self, parent=None, **fields):
+        fields = {'first_name': 'Kid', 'last_name': 'Test', 'birth_date': '2012-01-01', **fields}
+        return Member.objects.create(parent=parent, **fields)
+
+    def create_registration(self, member=None, status='VALIDATED', **kwargs):
+        """
+        Inscription dans la saison, par défaut pour un nouvel enfant de self.parent.
+        """
+        member = member or self.create_member(self.parent)
+        return Registration.objects.create(member=member, season=self.season, category=self.category, status=status, **kwargs)
+
+    def authenticate_admin(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin', 'admin@test.com', 'pwd'))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BatchPriceCalculatorTest(RegistrationFixturesMixin, TestCase):
+    def test_matches_single_calculation(self):
+        registrations = [
+            self.create_registration(),
+            self.create_registration(),
+            self.create_registration(status='PENDING', discount_percentage=Decimal('10')),
+            self.create_registration(),
+            self.create_registration(self.create_member()),
+            self.create_registration(self.create_member(), status='PENDING'),
+        ]
+        other_parent = User.objects.create(username='other')
+        registrations.append(self.create_registration(self.create_member(other_parent), city_hall_aid=True,
+                                                      city_hall_aid_amount=Decimal('50.00')))
+
+        prices = PriceCalculator.calculate_prices(Registration.objects.all())
+        for reg in registrations:
+            self.assertEqual(prices[reg.id], PriceCalculator.calculate_price(reg))
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        self.client = APIClient()
+        self.authenticate_admin()
+
+        self.create_registration()
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/registrations/')
+
+        for _ in range(5):
+            self.create_registration(self.create_member(User.objects.create(username=f'p{Registration.objects.count()}')))
+            self.create_registration()
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/registrations/')
+
+        self.assertEqual(len(response.data), 11)
+        self.assertEqual(len(small), len(large))
+
+
+from io import StringIO
+from django.core.management import call_command
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PriceSnapshotTest(RegistrationFixturesMixin, TestCase):
+    def test_snapshot_follows_sibling_status(self):
+        first = self.create_registration()
+        second = self.create_registration(status='PENDING')
+        self.assertEqual(first.final_price, Decimal('200.00'))
+        second.refresh_from_db()
+        # Le rang d'une inscription en attente compte les inscriptions validées de la famille
+        self.assertEqual(second.family_rank, 2)
+
+        second.status = 'VALIDATED'
+        second.save()
+        first.refresh_from_db()
+        self.assertEqual(first.family_rank, 2)
+        self.assertEqual(first.family_discount_amount, Decimal('20.00'))
+        self.assertEqual(first.remaining_to_pay, Decimal('180.00'))
+
+    def test_moved_registration_refreshes_previous_family(self):
+        first = self.create_registration()
+        second = self.create_registration()
+        first.refresh_from_db()
+        self.assertEqual(first.remaining_to_pay, Decimal('180.00'))
+
+        # Vers une autre saison : l'aîné redevient seul dans sa famille
+        second.season = Season.objects.create(name='2025-2026', start_date='2025-09-01', end_date='2026-06-30')
+        second.save()
+        first.refresh_from_db()
+        self.assertEqual((first.family_rank, first.remaining_to_pay), (1, Decimal('200.00')))
+
+        # Retour dans la saison, puis vers un adhérent d'une autre famille
+        second.season = self.season
+        second.save()
+        first.refresh_from_db()
+        self.assertEqual(first.family_rank, 2)
+        other = User.objects.create(username='other')
+        second.member = self.create_member(other, first_name='Other')
+        second.save()
+        first.refresh_from_db()
+        self.assertEqual((first.family_rank, first.remaining_to_pay), (1, Decimal('200.00')))
+        self.assertEqual(second.family_rank, 1)
+
+    def test_snapshot_follows_payment_and_category_price(self):
+        reg = self.create_registration()
+        reg.paid = True
+        reg.save()
+        self.assertEqual(reg.remaining_to_pay, Decimal('0.00'))
+
+        self.category.price = Decimal('250.00')
+        self.category.save()
+        reg.refresh_from_db()
+        self.assertEqual(reg.final_price, Decimal('250.00'))
+
+    def test_rebuild_command(self):
+        reg = self.create_registration()
+        Registration.objects.update(final_price=None, remaining_to_pay=None)
+        call_command('rebuild_price_snapshots', stdout=StringIO())
+        reg.refresh_from_db()
+        self.assertEqual(reg.remaining_to_pay, Decimal('200.00'))
+
+    def test_filter_and_order_by_remaining_balance(self):
+        settled = self.create_registration(paid=True)
+        due = self.create_registration()
+        client = APIClient()
+        client.force_authenticate(self.parent)
+
+        response = client.get('/api/registrations/', {'has_balance': 'true'})
+        self.assertEqual([r['id'] for r in response.data], [due.id])
+
+        response = client.get('/api/registrations/', {'ordering': '-remaining_to_pay'})
+        self.assertEqual([r['id'] for r in response.data], [due.id, settled.id])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatisticsViewTest(RegistrationFixturesMixin, TestCase):
+    def create_member(self, parent=None, gender='M', belt='WHITE', **fields):
+        return super().create_member(parent, gender=gender, belt=belt, **fields)
+
+    def test_statistics_use_family_pricing(self):
+        self.create_registration(paid=True)
+        self.create_registration(self.create_member(self.parent, gender='F', belt='YELLOW'), paid=True)
+        self.create_registration(self.create_member(self.parent, gender='F'))
+
+        with self.assertNumQueries(2):
+            response = APIClient().get('/api/statistics/')
+
+        data = response.data
+        self.assertEqual(data['total_members'], 3)
+        self.assertEqual(data['payment_status'], {'paid': 2, 'unpaid': 1})
+        self.assertEqual(data['gender_distribution'], [{'gender': 'F', 'count': 2}, {'gender': 'M', 'count': 1}])
+        self.assertEqual(data['belt_distribution'][0], {'belt': 'WHITE', 'count': 2})
+        # 3 enfants validés : chacun est au rang 3 (-20%) => 160€
+        self.assertEqual(data['total_revenue'], Decimal('320.00'))
+        self.assertEqual(data['outstanding_revenue'], Decimal('160.00'))
+
+    def test_statistics_without_snapshot(self):
+        self.create_registration(paid=True)
+        Registration.objects.update(final_price=None, remaining_to_pay=None)
+
+        data = APIClient().get('/api/statistics/').data
+        self.assertEqual(data['total_revenue'], Decimal('200.00'))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatisticsCacheTest(RegistrationFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.member = self.create_member()
+        self.client = APIClient()
+
+    def test_cache_hit_and_invalidation(self):
+        self.assertEqual(self.client.get('/api/statistics/')['X-Cache'], 'MISS')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/statistics/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['total_members'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_registration(self.member, status='PENDING')
+        response = self.client.get('/api/statistics/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['total_members'], 1)
+
+        self.member.gender = 'F'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.save()
+        response = self.client.get('/api/statistics/')
+        self.assertEqual(response.data['gender_distribution'], [{'gender': 'F', 'count': 1}])
+
+        self.authenticate_admin()
+        counters = self.client.get('/api/statistics/cache/').data
+        self.assertEqual((counters['hits'], counters['misses']), (1, 3))
+
+    def test_invalidation_waits_for_commit(self):
+        self.client.get('/api/statistics/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.create_registration(self.member, status='PENDING')
+            # Avant validation, les chiffres en cache restent ceux d'avant l'écriture
+            self.assertEqual(self.client.get('/api/statistics/')['X-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get('/api/statistics/').data['total_members'], 1)
+
+    def test_moved_registration_invalidates_previous_season(self):
+        registration = self.create_registration(self.member, status='PENDING')
+        self.assertEqual(self.client.get('/api/statistics/').data['total_members'], 1)
+
+        registration.season = Season.objects.create(name='2025-2026', start_date='2025-09-01', end_date='2026-06-30')
+        with self.captureOnCommitCallbacks(execute=True):
+            registration.save()
+        response = self.client.get('/api/statistics/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['total_members'], 0)
+
+
+import io
+import json
+import openpyxl
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RegistrationExportTest(RegistrationFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.parent.first_name, self.parent.last_name = 'Anne', 'Martin'
+        self.parent.save()
+        self.client = APIClient()
+
+    def register(self, parent=None, status='PENDING', **kwargs):
+        member = self.create_member(parent, last_name='Martin', birth_date='2012-03-01', email='kid@test.com')
+        return self.create_registration(member, status=status, **kwargs)
+
+    def test_xlsx_export(self):
+        self.register(self.parent, paid=True)
+        self.register()
+
+        response = self.client.get('/api/registrations/export/')
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook.active.iter_rows(values_only=True))
+
+        self.assertEqual(rows[0][:3], ("Nom", "Prénom", "Date de Naissance"))
+        self.assertEqual(len(rows), 3)
+        exported = {row[19]: row for row in rows[1:]}
+        self.assertEqual(exported["Anne Martin"][2], "01/03/2012")
+        self.assertEqual(exported["Anne Martin"][11], "Oui")
+        self.assertEqual(exported["N/A"][20], "kid@test.com")
+
+    def test_export_queries_do_not_grow_with_rows(self):
+        self.register(self.parent)
+        with CaptureQueriesContext(connection) as small:
+            b''.join(self.client.get('/api/registrations/export/').streaming_content)
+
+        for _ in range(5):
+            self.register(User.objects.create(username=f'p{Registration.objects.count()}'))
+        with CaptureQueriesContext(connection) as large:
+            b''.join(self.client.get('/api/registrations/export/').streaming_content)
+
+        self.assertEqual(len(small), len(large))
+
+    def test_csv_export(self):
+        self.register(self.parent, paid=True)
+
+        response = self.client.get('/api/registrations/export/', {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('Nom,Prénom,Date de Naissance'))
+        self.assertIn('01/03/2012', lines[1])
+
+    def test_ndjson_export(self):
+        self.register(self.parent, paid=True)
+        self.register(status='VALIDATED')
+
+        response = self.client.get('/api/registrations/export/', {'format': 'ndjson', 'status': 'VALIDATED'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['birth_date'], '2012-03-01')
+        self.assertIs(rows[0]['paid'], False)
+        self.assertEqual(rows[0]['parent_name'], 'N/A')
+
+    def test_member_export(self):
+        self.register(self.parent)
+        self.authenticate_admin()
+
+        response = self.client.get('/api/members/export/', {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['parent_email'] for row in rows], ['parent@test.com'])
+
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+from core.models import ExportJob, Invoice
+from core.tasks import run_export_job
+
+
+class TempMediaRootMixin:
+    """
+    MEDIA_ROOT temporaire, supprimé après chaque test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExportJobTest(TempMediaRootMixin, RegistrationFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for status_value in ['VALIDATED', 'VALIDATED', 'PENDING']:
+            self.create_registration(self.create_member(), status=status_value)
+
+        self.client = APIClient()
+        self.authenticate_admin()
+
+    def test_export_job_lifecycle(self):
+        with mock.patch('core.tasks.run_export_job.delay') as delay, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/export-jobs/', {'format': 'csv', 'filters': {'status': 'VALIDATED'}}, format='json')
+        self.assertEqual(response.status_code, 201)
+        job_id = response.data['id']
+        delay.assert_called_once_with(job_id)
+
+        self.assertEqual(self.client.get(f'/api/export-jobs/{job_id}/download/').status_code, 409)
+
+        self.assertTrue(run_export_job(job_id))
+        job = self.client.get(f'/api/export-jobs/{job_id}/').data
+        self.assertEqual((job['status'], job['total_rows'], job['processed_rows'], job['progress']), ('DONE', 2, 2, 100))
+
+        response = self.client.get(f'/api/export-jobs/{job_id}/download/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(ExportJob.objects.get(id=job_id).file.name.startswith('exports/'))
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.post('/api/export-jobs/', {'filters': {'season_id': 'abc'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+from content.models import Event, Convocation
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FamilyDashboardTest(RegistrationFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.parent)
+
+    def add_child(self, events=1):
+        registration = self.create_registration()
+        member = registration.member
+        Invoice.objects.create(member=member, registration=registration, amount=Decimal('200.00'), date_issued='2024-09-15')
+        for _ in range(events):
+            start = timezone.now() + timedelta(days=Event.objects.count() + 1)
+            event = Event.objects.create(title='Tournoi', description='Desc', start_time=start, end_time=start + timedelta(hours=2))
+            Convocation.objects.create(event=event, member=member)
+        return member
+
+    def test_dashboard_content(self):
+        self.add_child()
+        self.add_child()
+        self.create_member(self.parent, first_name='Adult', birth_date='1980-01-01')
+
+        data = self.client.get('/api/my-family/').data
+        self.assertEqual(len(data['children']), 3)
+        registrations = [child['active_registration'] for child in data['children'] if child['active_registration']]
+        self.assertEqual(len(registrations), 2)
+        # Deux enfants validés : rang 2 => -10%
+        self.assertEqual({reg['total_to_pay'] for reg in registrations}, {Decimal('180.00')})
+        self.assertEqual(len(data['convocations']), 2)
+        self.assertEqual(len(data['invoices']), 2)
+
+    def test_query_count_does_not_grow_with_family_size(self):
+        self.add_child()
+        with CaptureQueriesContext(connection) as small:
+            self.client.get('/api/my-family/')
+
+        for _ in range(4):
+            self.add_child(events=3)
+        Registration.objects.update(final_price=None, remaining_to_pay=None)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get('/api/my-family/')
+
+        self.assertEqual(len(response.data['convocations']), 13)
+        # Sans instantané de tarif, une seule requête de comptage supplémentaire pour toute la fratrie
+        self.assertLessEqual(len(large), len(small) + 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, REQUEST_PROFILING_ENABLED=True, REQUEST_PROFILING_SAMPLE_RATE=1.0)
+class RequestProfilingMiddlewareTest(RegistrationFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_registration()
+        self.client = APIClient()
+        self.authenticate_admin()
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('config.profiling', level='INFO') as logs:
+            response = self.client.get('/api/registrations/')
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        self.assertNotIn('SELECT', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/api/registrations/')
+        self.assertGreaterEqual(record['query_count'], 1)
+        self.assertEqual(record['response_bytes'], len(response.content))
+        self.assertLessEqual(len(record['slow_queries']), 3)
+        self.assertIn('SELECT', record['slow_queries'][0]['sql'])
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0.0)
+    def test_not_sampled(self):
+        response = self.client.get('/api/registrations/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_PROFILING_ENABLED=False)
+    def test_disabled(self):
+        with mock.patch('config.middleware.instrument_serializers') as instrument:
+            response = self.client.get('/api/registrations/')
+        self.assertFalse(response.has_header('Server-Timing'))
+        # DRF n'est pas modifié tant que le profilage est désactivé
+        instrument.assert_not_called()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class InvoicePdfCacheTest(TempMediaRootMixin, RegistrationFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        registration = self.create_registration()
+        self.member = registration.member
+        self.invoice = Invoice.objects.create(member=self.member, registration=registration, amount=Decimal('200.00'), date_issued='2024-09-15')
+        self.url = f'/api/invoices/{self.invoice.id}/download/'
+
+        render = mock.patch('core.invoice_cache.generate_invoice_pdf', return_value=b'%PDF-1.7 test')
+        self.render = render.start()
+        self.addCleanup(render.stop)
+
+        self.client = APIClient()
+        self.authenticate_admin()
+
+    def download(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def test_repeat_download_served_from_storage(self):
+        first = self.download()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(b''.join(first.streaming_content), b'%PDF-1.7 test')
+        self.assertIn('Facture_', first['Content-Disposition'])
+        self.assertTrue(first.has_header('Last-Modified'))
+
+        second = self.download()
+        self.assertEqual(b''.join(second.streaming_content), b'%PDF-1.7 test')
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_conditional_requests(self):
+        first = self.download()
+        self.assertEqual(self.download(If_None_Match=first['ETag']).status_code, 304)
+        self.assertEqual(self.download(If_Modified_Since=first['Last-Modified']).status_code, 304)
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_invoice_change_invalidates_cache(self):
+        first = self.download()
+        self.invoice.status = 'PAID'
+        self.invoice.save()
+        self.member.last_name = 'Renamed'
+        self.member.save()
+
+        second = self.download(If_None_Match=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.render.call_count, 2)
+        files = os.listdir(os.path.join(self.media_root, 'invoices', 'cache', str(self.invoice.id)))
+        self.assertEqual(len(files), 1)
+
+    def test_render_failure(self):
+        self.render.return_value = None
+        self.assertEqual(self.download().status_code, 500)
+
+
+from django.core.management.base import CommandError
+
+class BenchmarkCommandTest(TestCase):
+    def test_shared_cache_is_left_untouched(self):
+        output = os.path.join(tempfile.mkdtemp(), 'benchmark.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        cache.set('unrelated-key', 'kept')
+
+        call_command('benchmark_api', families=3, sessions=1, iterations=2, warmup=0, output=output, stdout=StringIO())
+
+        self.assertEqual(cache.get('unrelated-key'), 'kept')
+        with open(output) as report:
+            self.assertEqual(json.load(report)['endpoints']['statistics (cold cache)']['status_code'], 200)
+        # Données générées annulées
+        self.assertFalse(Member.objects.exists())
+
+    def test_rejects_zero_iterations(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', iterations=0, stdout=StringIO())
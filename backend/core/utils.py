@@ -1,95 +1,241 @@
+import csv
+import json
+import tempfile
+from datetime import date, datetime
+from itertools import chain, islice
+
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
-from django.http import HttpResponse
-from datetime import datetime
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import FileResponse, StreamingHttpResponse
+
+# Nombre de lignes lues par aller-retour en base pendant un export
+EXPORT_CHUNK_SIZE = 2000
+# Largeur maximale d'une colonne Excel (en caractères)
+MAX_COLUMN_WIDTH = 60
+
+
+def format_bool(val):
+    return "Oui" if val else "Non"
+
+
+def format_cell(value):
+    """
+    Mise en forme d'une valeur pour les exports tabulaires (Excel, CSV).
+    """
+    if isinstance(value, bool):
+        return format_bool(value)
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    return value
+
+
+def _parent_name(member):
+    parent = member.parent
+    return f"{parent.first_name} {parent.last_name}" if parent else "N/A"
+
+
+def _parent_email(member):
+    return member.parent.email if member.parent else member.email
+
+
+# Colonnes de l'export des inscriptions : (clé, en-tête, valeur)
+REGISTRATION_EXPORT_COLUMNS = [
+    ('last_name', "Nom", lambda reg: reg.member.last_name),
+    ('first_name', "Prénom", lambda reg: reg.member.first_name),
+    ('birth_date', "Date de Naissance", lambda reg: reg.member.birth_date),
+    ('gender', "Genre", lambda reg: reg.member.get_gender_display()),
+    ('address', "Adresse", lambda reg: reg.member.address),
+
+    ('category', "Catégorie", lambda reg: reg.category.name),
+    ('weight_category', "Poids", lambda reg: reg.member.get_weight_category_display() if reg.member.weight_category else ""),
+    ('discipline', "Discipline", lambda reg: reg.member.get_discipline_display()),
+    ('belt', "Ceinture", lambda reg: reg.member.get_belt_display()),
+    ('license_number', "Licence", lambda reg: reg.member.license_number),
+
+    ('image_rights', "Droit Image", lambda reg: reg.member.image_rights),
+    ('paid', "Payé", lambda reg: reg.paid),
+    ('status', "Statut", lambda reg: reg.get_status_display()),
+    ('payment_mode', "Mode Paiement", lambda reg: reg.get_payment_mode_display()),
+    ('installments_paid', "Mensualités", lambda reg: reg.installments_paid),
+
+    ('city_hall_aid', "Aide Mairie", lambda reg: reg.city_hall_aid),
+    ('city_hall_aid_amount', "Montant Aide", lambda reg: reg.city_hall_aid_amount),
+    ('has_supplementary_discipline', "Discipline Suppl.", lambda reg: reg.has_supplementary_discipline),
+    ('discount_amount', "Remise (€)", lambda reg: reg.discount_amount),
+
+    ('parent_name', "Nom Parent", lambda reg: _parent_name(reg.member)),
+    ('parent_email', "Email Parent", lambda reg: _parent_email(reg.member)),
+    ('phone', "Téléphone", lambda reg: reg.member.phone),
+    ('season', "Saison", lambda reg: reg.season.name),
+]
+
+
+# Colonnes de l'export des adhérents : (clé, en-tête, valeur)
+MEMBER_EXPORT_COLUMNS = [
+    ('id', "ID", lambda member: member.id),
+    ('last_name', "Nom", lambda member: member.last_name),
+    ('first_name', "Prénom", lambda member: member.first_name),
+    ('birth_date', "Date de Naissance", lambda member: member.birth_date),
+    ('gender', "Genre", lambda member: member.get_gender_display()),
+    ('address', "Adresse", lambda member: member.address),
+    ('email', "Email", lambda member: member.email),
+    ('phone', "Téléphone", lambda member: member.phone),
+    ('license_number', "Licence", lambda member: member.license_number),
+    ('has_passport', "Passeport", lambda member: member.has_passport),
+    ('weight_category', "Poids", lambda member: member.get_weight_category_display() if member.weight_category else ""),
+    ('discipline', "Discipline", lambda member: member.get_discipline_display()),
+    ('belt', "Ceinture", lambda member: member.get_belt_display()),
+    ('image_rights', "Droit Image", lambda member: member.image_rights),
+    ('medical_certificate_valid_until', "Validité Certificat", lambda member: member.medical_certificate_valid_until),
+    ('parent_name', "Nom Parent", _parent_name),
+    ('parent_email', "Email Parent", _parent_email),
+]
+
+EXPORT_CONTENT_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def iterate_registrations(registrations, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Parcourt les inscriptions par lots, relations chargées en une seule requête.
+    """
+    if isinstance(registrations, QuerySet):
+        return registrations.select_related('member__parent', 'category', 'season').iterator(chunk_size=chunk_size)
+    return iter(registrations)
+
+
+def iterate_members(members, chunk_size=EXPORT_CHUNK_SIZE):
+    if isinstance(members, QuerySet):
+        return members.select_related('parent').iterator(chunk_size=chunk_size)
+    return iter(members)
+
+
+class Echo:
+    """
+    Pseudo-fichier pour csv.writer : renvoie la ligne écrite au lieu de la stocker.
+    """
+    def write(self, value):
+        return value
+
+
+def stream_csv(objects, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for _, header, _ in columns])
+    for obj in objects:
+        yield writer.writerow([format_cell(getter(obj)) for _, _, getter in columns])
+
+
+def stream_ndjson(objects, columns):
+    """
+    Une ligne JSON par objet, valeurs brutes (booléens, dates ISO, montants en chaîne).
+    """
+    for obj in objects:
+        yield json.dumps({key: getter(obj) for key, _, getter in columns}, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def write_xlsx(objects, columns, fileobj, title, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Écrit un classeur Excel en mode "write-only" (mémoire constante quel que soit le volume).
+    En mode write-only, les largeurs de colonnes doivent être fixées avant la première ligne :
+    elles sont calculées sur le premier lot de lignes, gardé en mémoire le temps de la mesure.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+
+    rows = ([format_cell(getter(obj)) for _, _, getter in columns] for obj in objects)
+    first_chunk = list(islice(rows, chunk_size))
+
+    widths = [len(header) for _, header, _ in columns]
+    for row in first_chunk:
+        for index, value in enumerate(row):
+            if value is not None:
+                widths[index] = max(widths[index], len(str(value)))
+    for index, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    header_font = Font(bold=True)
+    header_row = []
+    for _, header, _ in columns:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        header_row.append(cell)
+    ws.append(header_row)
+
+    for row in chain(first_chunk, rows):
+        ws.append(row)
+
+    wb.save(fileobj)
+
+
+def track_progress(objects, callback, every=EXPORT_CHUNK_SIZE):
+    """
+    Itère sur les objets en appelant callback(nombre traité) tous les `every` éléments, puis à la fin.
+    """
+    count = 0
+    for obj in objects:
+        yield obj
+        count += 1
+        if count % every == 0:
+            callback(count)
+    callback(count)
+
+
+def write_export(objects, columns, export_format, fileobj, title):
+    """
+    Écrit un export complet dans un fichier binaire (utilisé par les exports en tâche de fond).
+    """
+    if export_format == 'xlsx':
+        write_xlsx(objects, columns, fileobj, title)
+        return
+    stream = stream_csv if export_format == 'csv' else stream_ndjson
+    for chunk in stream(objects, columns):
+        fileobj.write(chunk.encode('utf-8'))
+
+
+def export_response(objects, columns, export_format, filename, title):
+    """
+    Construit la réponse d'export au format demandé (xlsx, csv ou ndjson).
+    CSV et NDJSON sont envoyés au fil de la lecture du curseur (StreamingHttpResponse).
+    """
+    content_type = EXPORT_CONTENT_TYPES[export_format]
+    full_filename = f'{filename}_{datetime.now().strftime("%Y%m%d")}.{export_format}'
+
+    if export_format == 'xlsx':
+        export_file = tempfile.TemporaryFile()
+        write_xlsx(objects, columns, export_file, title)
+        export_file.seek(0)
+        return FileResponse(export_file, as_attachment=True, filename=full_filename, content_type=content_type)
+
+    stream = stream_csv if export_format == 'csv' else stream_ndjson
+    response = StreamingHttpResponse(stream(objects, columns), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{full_filename}"'
+    return response
+
 
 def export_registrations_to_excel(registrations):
     """
     Génère un fichier Excel contenant la liste détaillée des inscriptions.
+    Le classeur est écrit dans un fichier temporaire puis envoyé par blocs (FileResponse).
     """
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Inscriptions"
-
-    # Headers
-    headers = [
-        "Nom", "Prénom", "Date de Naissance", "Genre", "Adresse", 
-        "Catégorie", "Poids", "Discipline", "Ceinture", "Licence", 
-        "Droit Image", "Payé", "Statut", "Mode Paiement", "Mensualités", 
-        "Aide Mairie", "Montant Aide", "Discipline Suppl.", "Remise (€)",
-        "Nom Parent", "Email Parent", "Téléphone", "Saison"
-    ]
-    
-    for col_num, header in enumerate(headers, 1):
-        col_letter = get_column_letter(col_num)
-        ws[f"{col_letter}1"] = header
-        ws[f"{col_letter}1"].font = openpyxl.styles.Font(bold=True)
-
-    # Data
-    for row_num, reg in enumerate(registrations, 2):
-        member = reg.member
-        parent = member.parent
-        
-        # Parent Info
-        parent_name = f"{parent.first_name} {parent.last_name}" if parent else "N/A"
-        parent_email = parent.email if parent else member.email
-        
-        # Format Boolean
-        def format_bool(val):
-            return "Oui" if val else "Non"
-
-        # Mapping data to columns
-        data = [
-            member.last_name,
-            member.first_name,
-            member.birth_date.strftime("%d/%m/%Y") if member.birth_date else "",
-            member.get_gender_display(),
-            member.address,
-            
-            reg.category.name,
-            member.get_weight_category_display() if member.weight_category else "",
-            member.get_discipline_display(),
-            member.get_belt_display(),
-            member.license_number,
-            
-            format_bool(member.image_rights),
-            format_bool(reg.paid),
-            reg.get_status_display(),
-            reg.get_payment_mode_display(),
-            reg.installments_paid,
-            
-            format_bool(reg.city_hall_aid),
-            reg.city_hall_aid_amount,
-            format_bool(reg.has_supplementary_discipline),
-            reg.discount_amount,
-            
-            parent_name,
-            parent_email,
-            member.phone,
-            reg.season.name
-        ]
-
-        for col_num, cell_value in enumerate(data, 1):
-            col_letter = get_column_letter(col_num)
-            ws[f"{col_letter}{row_num}"] = cell_value
-
-    # Auto-adjust column width
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    return export_registrations(registrations, 'xlsx')
+
+
+def export_registrations(registrations, export_format):
+    return export_response(
+        iterate_registrations(registrations), REGISTRATION_EXPORT_COLUMNS, export_format,
+        'inscriptions_export', "Inscriptions",
+    )
+
+
+def export_members(members, export_format):
+    return export_response(
+        iterate_members(members), MEMBER_EXPORT_COLUMNS, export_format,
+        'adherents_export', "Adhérents",
     )
-    response['Content-Disposition'] = f'attachment; filename=inscriptions_export_{datetime.now().strftime("%Y%m%d")}.xlsx'
-    
-    wb.save(response)
-    return response
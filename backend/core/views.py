@@ -1,17 +1,29 @@
-from rest_framework import viewsets, status, views
+from rest_framework import viewsets, mixins, status, views, filters, permissions
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count, Sum
-from .models import Season, Category, Member, Registration, Invoice, PaymentOption
+from .models import Season, Category, Member, Registration, Invoice, PaymentOption, ExportJob
+from .services import PriceCalculator
+from .cache import get_season_statistics, get_statistics_cache_counters
+from .filters import RegistrationFilter
+from .renderers import EXPORT_RENDERER_CLASSES
 from content.models import Convocation
 from .serializers import (
     SeasonSerializer, CategorySerializer, MemberSerializer, 
     RegistrationSerializer, InvoiceSerializer, CustomTokenObtainPairSerializer, UserSerializer,
-    PaymentOptionSerializer
+    PaymentOptionSerializer, ExportJobSerializer
 )
-from django.db import connection
+from django.db import connection, transaction
+from django.db.models import Prefetch
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+def get_export_format(request):
+    """
+    Format d'export négocié via `?format=` (xlsx par défaut).
+    """
+    export_format = request.accepted_renderer.format
+    return export_format if export_format in ('xlsx', 'csv', 'ndjson') else 'xlsx'
+
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
@@ -32,9 +44,9 @@ class StatisticsView(views.APIView):
     """
     Vue API pour récupérer les indicateurs clés de performance (KPI) et statistiques du club.
     Retourne les données pour:
-    - Répartition par catégorie
-    - Répartition par genre
-    - Revenus totaux
+    - Répartition par catégorie, genre, discipline et ceinture
+    - Répartition payé / non payé
+    - Revenus encaissés, attendus et restant à percevoir (tarifs de PriceCalculator)
     - Nombre total d'adhérents
     """
     def get(self, request):
@@ -46,38 +58,27 @@ class StatisticsView(views.APIView):
                 'season': 'Aucune saison active',
                 'registrations_per_category': [],
                 'gender_distribution': [],
+                'discipline_distribution': [],
+                'belt_distribution': [],
+                'payment_status': {'paid': 0, 'unpaid': 0},
                 'total_revenue': 0,
+                'expected_revenue': 0,
+                'outstanding_revenue': 0,
                 'total_members': 0
             })
 
-        # 1. Inscriptions par catégorie
-        registrations_per_category = Registration.objects.filter(season=active_season) \
-            .values('category__name') \
-            .annotate(count=Count('id')) \
-            .order_by('-count')
-
-        # 2. Répartition par genre
-        gender_distribution = Member.objects.filter(registrations__season=active_season) \
-            .values('gender') \
-            .annotate(count=Count('id'))
-
-        # 3. Revenu total (Inscriptions payées * Prix de la catégorie)
-        total_revenue = 0
-        paid_registrations = Registration.objects.filter(season=active_season, paid=True)
-        for reg in paid_registrations:
-            total_revenue += reg.category.price
-
-        # 4. Nombre total d'adhérents
-        total_members = Registration.objects.filter(season=active_season).count()
-
-        data = {
-            'season': active_season.name,
-            'registrations_per_category': list(registrations_per_category),
-            'gender_distribution': list(gender_distribution),
-            'total_revenue': total_revenue,
-            'total_members': total_members
-        }
-        return Response(data)
+        data, hit = get_season_statistics(active_season)
+        return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+
+class StatisticsCacheView(views.APIView):
+    """
+    Compteurs de succès / échecs du cache des statistiques (suivi de l'efficacité du cache).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_statistics_cache_counters())
 
 from django.contrib.auth.models import User
 from rest_framework.permissions import AllowAny
@@ -190,27 +191,29 @@ class RegistrationViewSet(viewsets.ModelViewSet):
     """
     ViewSet pour gérer les inscriptions.
     """
-    queryset = Registration.objects.all()
+    queryset = Registration.objects.select_related('member__parent', 'season', 'category', 'payment_option')
     serializer_class = RegistrationSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = RegistrationFilter
+    ordering_fields = ['created_at', 'final_price', 'remaining_to_pay', 'member__last_name']
 
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERER_CLASSES)
     def export(self, request):
         """
-        Exporte les inscriptions en Excel.
+        Exporte les inscriptions en Excel (par défaut), CSV (?format=csv) ou NDJSON (?format=ndjson).
         """
-        from .utils import export_registrations_to_excel
+        from .utils import export_registrations
         queryset = self.filter_queryset(self.get_queryset())
-        return export_registrations_to_excel(queryset)
+        return export_registrations(queryset, get_export_format(request))
 
     @action(detail=True, methods=['get'])
     def price_details(self, request, pk=None):
         """
         Retourne les détails du calcul du prix pour cette inscription.
         """
-        from .services import PriceCalculator
         registration = self.get_object()
         details = PriceCalculator.calculate_price(registration)
         return Response(details)
@@ -226,12 +229,21 @@ class MemberViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        members = Member.objects.select_related('parent')
         if user.is_staff:
-            return Member.objects.all()
+            return members
         if user.is_authenticated:
-            return Member.objects.filter(parent=user)
+            return members.filter(parent=user)
         return Member.objects.none()
 
+    @action(detail=False, methods=['get'], renderer_classes=EXPORT_RENDERER_CLASSES)
+    def export(self, request):
+        """
+        Exporte les adhérents en Excel (par défaut), CSV (?format=csv) ou NDJSON (?format=ndjson).
+        """
+        from .utils import export_members
+        return export_members(self.get_queryset().order_by('last_name', 'first_name'), get_export_format(request))
+
     def perform_create(self, serializer):
         # Admin can set 'parent' explicitly via serializer
         if self.request.user.is_staff:
@@ -257,23 +269,74 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
 
+    def get_queryset(self):
+        if self.action == 'download':
+            return Invoice.objects.select_related('member', 'registration__season', 'registration__category')
+        return super().get_queryset()
+
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         """
-        Génère et télécharge le PDF de la facture.
+        Télécharge le PDF de la facture. Le PDF est généré une seule fois par version
+        de la facture (voir core/invoice_cache.py) puis servi depuis le stockage,
+        avec ETag / Last-Modified pour les requêtes conditionnelles.
         """
-        from django.http import HttpResponse
-        from .pdf_generator import generate_invoice_pdf
-        
+        from django.core.files.storage import default_storage
+        from django.http import FileResponse
+        from django.utils.cache import get_conditional_response
+        from django.utils.http import http_date
+        from .invoice_cache import get_invoice_pdf, invoice_fingerprint
+
         invoice = self.get_object()
-        pdf = generate_invoice_pdf(invoice)
-        
-        if pdf:
-            response = HttpResponse(pdf, content_type='application/pdf')
-            filename = f"Facture_{invoice.id}_{invoice.member.last_name}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
-        return Response({'error': 'Erreur lors de la génération du PDF'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        etag = f'"{invoice_fingerprint(invoice)}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        path, _ = get_invoice_pdf(invoice)
+        if path is None:
+            return Response({'error': 'Erreur lors de la génération du PDF'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        last_modified = int(default_storage.get_modified_time(path).timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        filename = f"Facture_{invoice.id}_{invoice.member.last_name}.pdf"
+        response = FileResponse(default_storage.open(path, 'rb'), as_attachment=True, filename=filename,
+                                content_type='application/pdf')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class ExportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet des exports en tâche de fond (réservé aux administrateurs).
+    - POST : crée l'export et le confie à Celery
+    - GET : suivi de l'avancement (status, processed_rows / total_rows, progress)
+    - download : télécharge le fichier une fois l'export terminé
+    """
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def perform_create(self, serializer):
+        from .tasks import run_export_job
+        job = serializer.save(requested_by=self.request.user)
+        transaction.on_commit(lambda: run_export_job.delay(job.id))
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Sert le fichier d'export depuis le disque.
+        """
+        from django.http import FileResponse
+        job = self.get_object()
+        if job.status != 'DONE' or not job.file:
+            return Response({'error': 'Export non terminé', 'status': job.status}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.file.name.rsplit('/', 1)[-1])
 
 
 class FamilyViewSet(viewsets.ViewSet):
@@ -289,26 +352,36 @@ class FamilyViewSet(viewsets.ViewSet):
 
     def list(self, request):
         user = request.user
-        members = Member.objects.filter(parent=user)
+        members = Member.objects.filter(parent=user).select_related('parent')
+
+        # Active registration of each child, fetched in a single prefetch query
+        active_season = Season.objects.filter(is_active=True).first()
+        if active_season:
+            members = members.prefetch_related(Prefetch(
+                'registrations',
+                queryset=Registration.objects.filter(season=active_season).select_related('season', 'category', 'payment_option'),
+                to_attr='active_registrations'
+            ))
+        members = list(members)
         
         # Serialize members
         members_data = MemberSerializer(members, many=True).data
 
         # Add active registration info to each member
-        active_season = Season.objects.filter(is_active=True).first()
         if active_season:
-            for member_data in members_data:
-                member_id = member_data['id']
-                registration = Registration.objects.filter(member_id=member_id, season=active_season).first()
-                if registration:
+            registrations = [reg for member in members for reg in member.active_registrations]
+            # Prix de la fratrie calculés en une seule fois (uniquement sans instantané de tarif)
+            prices = PriceCalculator.calculate_prices(reg for reg in registrations if reg.final_price is None)
+            for member, member_data in zip(members, members_data):
+                if member.active_registrations:
                     # Use serializer to get computed fields (total_to_pay, etc.)
-                    reg_data = RegistrationSerializer(registration).data
+                    reg_data = RegistrationSerializer(member.active_registrations[0], context={'prices': prices}).data
                     member_data['active_registration'] = reg_data
                 else:
                     member_data['active_registration'] = None
 
         # Get convocations for these members
-        convocations = Convocation.objects.filter(member__in=members).order_by('-event__start_time')
+        convocations = Convocation.objects.filter(member__parent=user).select_related('event', 'member').order_by('-event__start_time')
         # We need a serializer for convocations, or build it manually for now
         convocations_data = []
         for conv in convocations:
@@ -323,7 +396,7 @@ class FamilyViewSet(viewsets.ViewSet):
             })
 
         # Get invoices for these members
-        invoices = Invoice.objects.filter(member__in=members).order_by('-date_issued')
+        invoices = Invoice.objects.filter(member__parent=user).order_by('-date_issued')
         invoices_data = InvoiceSerializer(invoices, many=True).data
 
         return Response({
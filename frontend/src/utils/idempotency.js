@@ -0,0 +1,8 @@
+// Clé d'idempotence d'un envoi : réutilisée si la même soumission est renvoyée
+// (double clic, nouvel essai après une erreur réseau), pour que le serveur ne l'envoie qu'une fois.
+
+export const newIdempotencyKey = () => {
+    if (globalThis.crypto?.randomUUID) return globalThis.crypto.randomUUID()
+    // crypto.randomUUID n'existe qu'en contexte sécurisé (HTTPS / localhost)
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}${Math.random().toString(36).slice(2)}`
+}